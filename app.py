@@ -1,16 +1,41 @@
 import os
+import io
+import hashlib
 import uuid
 import json
 import logging
 import re
+import functools
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import ahocorasick  # Optional C extension for multi-pattern model search
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # Optional faster JSON encoder for API responses
+except ImportError:
+    orjson = None
+
+try:
+    from redis import Redis
+    from rq import Queue
+except ImportError:
+    Redis = None
+    Queue = None
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG, 
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, session, g
+logger = logging.getLogger(__name__)
+from flask import Flask, Response, render_template, request, jsonify, flash, redirect, url_for, session, g
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
-import tempfile
 from flask_sqlalchemy import SQLAlchemy
+from flask_caching import Cache
 from sqlalchemy.orm import DeclarativeBase
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from flask_wtf import FlaskForm
@@ -24,18 +49,73 @@ class Base(DeclarativeBase):
 # Initialize SQLAlchemy with the Base class
 db = SQLAlchemy(model_class=Base)
 
+NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7f]')
+
+def _escape_non_ascii(match):
+    """\\uXXXX escape (a surrogate pair outside the BMP) for one character, as json.dumps does"""
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return '\\u%04x\\u%04x' % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+    return '\\u%04x' % code
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    jsonify() via orjson, producing the same output as Flask's default provider
+    
+    orjson always writes raw UTF-8, so when ensure_ascii is set (Flask's default) any
+    non-ASCII characters are escaped afterwards. Integers too large for orjson fall
+    back to the stdlib encoder. Unlike the stdlib, NaN/Infinity come out as null.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        # Let Flask's default() keep rendering datetimes, Decimals etc. exactly as before
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            text = orjson.dumps(obj, default=self.default, option=option).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+        # Non-ASCII can only occur inside JSON strings, so escaping the text is safe
+        if kwargs.get("ensure_ascii", self.ensure_ascii) and not text.isascii():
+            text = NON_ASCII_PATTERN.sub(_escape_non_ascii, text)
+        return text
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Create the Flask app
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key-for-development")
 
 # Configure database
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
+    "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
     "pool_pre_ping": True,
 }
+if not (app.config["SQLALCHEMY_DATABASE_URI"] or "").startswith("sqlite"):
+    # Sized for Supabase's transaction pooler (pgBouncer, port 6543); psycopg2 doesn't
+    # use server-side prepared statements, so transaction mode needs no extra settings
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].update({
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "15")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "30")),
+    })
 db.init_app(app)
 
+# Configure caching - Redis when available so all workers share invalidations
+if os.environ.get("REDIS_URL"):
+    app.config["CACHE_TYPE"] = "RedisCache"
+    app.config["CACHE_REDIS_URL"] = os.environ.get("REDIS_URL")
+else:
+    app.config["CACHE_TYPE"] = "SimpleCache"
+app.config["CACHE_DEFAULT_TIMEOUT"] = 300
+cache = Cache(app)
+
 # Configure Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -49,17 +129,15 @@ with app.app_context():
 @login_manager.user_loader
 def load_user(user_id):
     from models import User
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
 
 # Import Excel parser and PDF parser
 from utils.excel_parser import parse_excel_file
 from utils.pdf_parser import extract_data_from_pdf
 
-# Configure temporary file storage
-UPLOAD_FOLDER = tempfile.gettempdir()
+# Configure uploads (files are parsed straight from the request stream)
 ALLOWED_EXTENSIONS_XLSX = {'xlsx'}
 ALLOWED_EXTENSIONS_PDF = {'pdf'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
 
 def allowed_file(filename, allowed_extensions):
@@ -139,68 +217,84 @@ def pricebooks():
 def process_po():
     return render_template('process_po.html')
 
+@cache.memoize(timeout=300)
+def _dashboard_metrics(user_id):
+    """
+    Computes the aggregate dashboard metrics for a user
+    
+    Cached per user; call invalidate_dashboard_metrics() whenever the user's
+    processed POs change.
+    """
+    # Only count each unique PO number once (use the most recent one).
+    # row_number() dedupes on the stored po_number column in Postgres and SQLite alike.
+    ranked_pos = db.session.query(
+        ProcessedPO.id,
+        db.func.row_number().over(
+            partition_by=ProcessedPO.po_number,
+            order_by=(ProcessedPO.processed_at.desc(), ProcessedPO.id.desc())
+        ).label('recency')
+    ).filter(ProcessedPO.user_id == user_id).subquery()
+    latest_pos = db.select(ranked_pos.c.id).where(ranked_pos.c.recency == 1).subquery()
+    unique_po_count = db.session.query(db.func.count()).select_from(latest_pos).scalar() or 0
+
+    # Calculate overall metrics in a single aggregate query over those POs' line items
+    def count_status(status):
+        return db.func.sum(db.case((POLineItem.status == status, 1), else_=0))
+
+    # Savings are counted when PO price < book price, meaning you're paying less
+    savings = db.case(
+        (db.and_(POLineItem.status == 'Mismatch', POLineItem.po_price < POLineItem.book_price),
+         POLineItem.book_price - POLineItem.po_price),
+        else_=0
+    )
+
+    totals = db.session.query(
+        db.func.count(POLineItem.id),
+        count_status('Match'),
+        count_status('Mismatch'),
+        count_status('Model Not Found'),
+        db.func.sum(savings)
+    ).filter(POLineItem.processed_po_id.in_(db.select(latest_pos.c.id))).one()
+
+    total_lines_reviewed = totals[0] or 0
+    total_matches = totals[1] or 0
+    total_mismatches = totals[2] or 0
+    total_not_found = totals[3] or 0
+    total_savings = float(totals[4] or 0.0)
+
+    # Calculate percentages
+    match_percentage = (total_matches / total_lines_reviewed * 100) if total_lines_reviewed > 0 else 0
+    mismatch_percentage = (total_mismatches / total_lines_reviewed * 100) if total_lines_reviewed > 0 else 0
+    not_found_percentage = (total_not_found / total_lines_reviewed * 100) if total_lines_reviewed > 0 else 0
+
+    # Average savings per PO
+    avg_savings_per_po = total_savings / unique_po_count if unique_po_count else 0
+
+    return {
+        'total_pos': unique_po_count,  # Unique PO count
+        'total_lines_reviewed': total_lines_reviewed,
+        'total_matches': total_matches,
+        'total_mismatches': total_mismatches,
+        'total_not_found': total_not_found,
+        'total_savings': total_savings,
+        'match_percentage': round(match_percentage, 1),
+        'mismatch_percentage': round(mismatch_percentage, 1),
+        'not_found_percentage': round(not_found_percentage, 1),
+        'avg_savings_per_po': avg_savings_per_po
+    }
+
+def invalidate_dashboard_metrics(user_id):
+    """Drops the cached dashboard metrics for a user"""
+    cache.delete_memoized(_dashboard_metrics, user_id)
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     try:
-        # Get all processed POs for this user
-        processed_pos = ProcessedPO.query.filter_by(user_id=current_user.id).all()
-        
-        # Calculate overall metrics - only count each unique PO once
-        po_numbers_processed = {}  # Track unique PO numbers and their data
-        total_lines_reviewed = 0
-        total_mismatches = 0
-        total_not_found = 0
-        total_matches = 0
-        total_savings = 0.0
+        metrics = dict(_dashboard_metrics(current_user.id))
         
-        for po in processed_pos:
-            # Extract PO number from filename to ensure uniqueness
-            po_number = extract_po_number_from_filename(po.filename)
-            
-            # Only process each unique PO number once (use the most recent one)
-            if po_number not in po_numbers_processed:
-                po_numbers_processed[po_number] = po
-                
-                line_items = POLineItem.query.filter_by(processed_po_id=po.id).all()
-                
-                for item in line_items:
-                    total_lines_reviewed += 1
-                    
-                    if item.status == 'Match':
-                        total_matches += 1
-                    elif item.status == 'Mismatch':
-                        total_mismatches += 1
-                        # Calculate savings (when PO price < book price, meaning you're paying less)
-                        if item.book_price and item.po_price < item.book_price:
-                            total_savings += (item.book_price - item.po_price)
-                    elif item.status == 'Model Not Found':
-                        total_not_found += 1
-        
-        # Calculate percentages
-        match_percentage = (total_matches / total_lines_reviewed * 100) if total_lines_reviewed > 0 else 0
-        mismatch_percentage = (total_mismatches / total_lines_reviewed * 100) if total_lines_reviewed > 0 else 0
-        not_found_percentage = (total_not_found / total_lines_reviewed * 100) if total_lines_reviewed > 0 else 0
-        
-        # Average savings per PO
-        avg_savings_per_po = total_savings / len(po_numbers_processed) if po_numbers_processed else 0
-        
-        # Recent activity (last 10 POs)
-        recent_pos = ProcessedPO.query.filter_by(user_id=current_user.id).order_by(ProcessedPO.processed_at.desc()).limit(10).all()
-        
-        metrics = {
-            'total_pos': len(po_numbers_processed),  # Unique PO count
-            'total_lines_reviewed': total_lines_reviewed,
-            'total_matches': total_matches,
-            'total_mismatches': total_mismatches,
-            'total_not_found': total_not_found,
-            'total_savings': total_savings,
-            'match_percentage': round(match_percentage, 1),
-            'mismatch_percentage': round(mismatch_percentage, 1),
-            'not_found_percentage': round(not_found_percentage, 1),
-            'avg_savings_per_po': avg_savings_per_po,
-            'recent_pos': recent_pos
-        }
+        # Recent activity (last 10 POs) - not cached, the template reads ORM relationships
+        metrics['recent_pos'] = ProcessedPO.query.filter_by(user_id=current_user.id).order_by(ProcessedPO.processed_at.desc()).limit(10).all()
         
         return render_template('dashboard.html', metrics=metrics)
         
@@ -220,16 +314,20 @@ def admin_panel():
     # Get all users with their stats
     users = db.session.query(User).all()
     user_stats = []
-    
+
+    # Count price books and processed POs for all users in one grouped query each
+    price_book_counts = dict(
+        db.session.query(PriceBook.user_id, db.func.count(PriceBook.id)).group_by(PriceBook.user_id).all()
+    )
+    processed_po_counts = dict(
+        db.session.query(ProcessedPO.user_id, db.func.count(ProcessedPO.id)).group_by(ProcessedPO.user_id).all()
+    )
+
     for user in users:
-        # Count user's price books and processed POs
-        price_book_count = PriceBook.query.filter_by(user_id=user.id).count()
-        processed_po_count = ProcessedPO.query.filter_by(user_id=user.id).count()
-        
         user_stats.append({
             'user': user,
-            'price_book_count': price_book_count,
-            'processed_po_count': processed_po_count
+            'price_book_count': price_book_counts.get(user.id, 0),
+            'processed_po_count': processed_po_counts.get(user.id, 0)
         })
     
     return render_template('admin.html', user_stats=user_stats)
@@ -281,6 +379,7 @@ def delete_user(user_id):
         # Delete the user
         db.session.delete(user)
         db.session.commit()
+        invalidate_dashboard_metrics(user_id)
         
         flash(f'User {user.username} and all associated data deleted successfully.', 'success')
     except Exception as e:
@@ -311,6 +410,37 @@ def get_price_books():
         logging.error(f"Error getting price books: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Price books with at least this many items are loaded with COPY instead of INSERT
+COPY_THRESHOLD = 2000
+PRICE_ITEM_COPY_COLUMNS = ['model_number', 'price', 'price_book_id', 'source_column', 'excel_row']
+
+def use_copy_for(item_count):
+    """True if a price book of item_count items should be loaded with COPY (Postgres only)"""
+    return item_count >= COPY_THRESHOLD and db.engine.dialect.name == 'postgresql'
+
+def copy_price_items(price_data):
+    """
+    Bulk loads price items with Postgres COPY FROM STDIN
+    
+    Runs on the session's own connection, inside its current transaction, so the
+    caller's commit (or rollback) covers the price book and its items together.
+    
+    Args:
+        price_data (DataFrame): Parsed price items including a price_book_id column
+    """
+    buffer = io.StringIO()
+    price_data.to_csv(buffer, columns=PRICE_ITEM_COPY_COLUMNS, index=False, header=False)
+    buffer.seek(0)
+    
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {PriceItem.__table__.name} ({', '.join(PRICE_ITEM_COPY_COLUMNS)}) FROM STDIN WITH CSV",
+            buffer
+        )
+    finally:
+        cursor.close()
+
 @app.route('/api/pricebooks', methods=['POST'])
 @login_required
 def upload_price_book():
@@ -328,19 +458,26 @@ def upload_price_book():
     
     if file and allowed_file(file.filename, ALLOWED_EXTENSIONS_XLSX):
         try:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            # Hash the upload so re-uploading the same file skips the parse and insert
+            file_bytes = file.read()
+            content_sha256 = hashlib.sha256(file_bytes).hexdigest()
             
-            # Parse the Excel file
-            price_data = parse_excel_file(filepath)
+            existing_book = PriceBook.query.filter_by(user_id=current_user.id, content_sha256=content_sha256).first()
+            if existing_book:
+                return jsonify({
+                    "success": True,
+                    "price_book_id": existing_book.id,
+                    "message": f"This file was already uploaded as price book '{existing_book.name}'"
+                })
             
             # Check if price book with the same name already exists for this user
             existing_book = PriceBook.query.filter_by(name=pricebook_name, user_id=current_user.id).first()
             if existing_book:
-                os.remove(filepath)  # Clean up the temp file
                 return jsonify({"error": f"Price book '{pricebook_name}' already exists"}), 400
             
+            # Parse the Excel file from the uploaded bytes
+            price_data = parse_excel_file(io.BytesIO(file_bytes))
+            
             # Add to database using SQLAlchemy
             pricebook_id = str(uuid.uuid4())
             logging.debug(f"Generated price book ID: {pricebook_id}")
@@ -348,63 +485,42 @@ def upload_price_book():
             logging.debug(f"Number of items in price data: {len(price_data)}")
             
             # Log a few sample items
-            items_sample = list(price_data.items())[:5] if price_data else []
-            logging.debug(f"Sample items: {items_sample}")
+            logging.debug(f"Sample items: {price_data.head().to_dict('records')}")
             
-            # Create and save price book FIRST with the current user's ID
-            new_price_book = PriceBook(id=pricebook_id, name=pricebook_name, user_id=current_user.id)
+            # Create the price book with the current user's ID
+            new_price_book = PriceBook(id=pricebook_id, name=pricebook_name, user_id=current_user.id,
+                                       content_sha256=content_sha256)
             db.session.add(new_price_book)
-            db.session.commit()  # Save the price book first so items can reference it
-            logging.debug(f"Created and saved price book: {new_price_book}")
-            
-            # Add price items in batches to handle large uploads (up to 5000+ items)
-            item_count = 0
-            batch_size = 50  # Larger batches for faster processing, but still safe
-            items_to_add = []
-            
-            for model_number, price_info in price_data.items():
-                try:
-                    # Handle new data structure with price, source column, and Excel row
-                    if isinstance(price_info, dict):
-                        price_float = float(price_info["price"])
-                        source_column = price_info["source_column"]
-                        excel_row = price_info.get("excel_row")  # Keep as integer, not string
-                        if excel_row == "Unknown":
-                            excel_row = None
-                    else:
-                        # Fallback for old format
-                        price_float = float(price_info)
-                        source_column = "Unknown"
-                        excel_row = None
-                    
-                    new_item = PriceItem(model_number=model_number, price=price_float, price_book_id=pricebook_id, source_column=source_column, excel_row=excel_row)
-                    items_to_add.append(new_item)
-                    item_count += 1
-                    
-                    # Process in batches
-                    if len(items_to_add) >= batch_size:
-                        db.session.add_all(items_to_add)
-                        db.session.commit()
-                        logging.info(f"Successfully processed batch: {item_count - len(items_to_add) + 1} to {item_count} items")
-                        items_to_add = []
-                    
-                    # Skip individual item logging for performance
-                except Exception as item_error:
-                    logging.error(f"Error adding item {model_number}: {str(item_error)}")
             
-            # Add any remaining items
-            if items_to_add:
-                db.session.add_all(items_to_add)
-                db.session.commit()
-                logging.debug(f"Committed final batch of {len(items_to_add)} items")
+            # Load all price items as one typed column batch
+            price_data["price_book_id"] = pricebook_id
+            # The book and its items commit once, so a failed load never leaves an empty
+            # book behind for the content_sha256 check above to return on re-upload
+            db.session.flush()
+            if price_data.empty:
+                # Header-only sheets or sheets without valid prices still create an (empty) book;
+                # an insert with no rows would become INSERT ... DEFAULT VALUES
+                pass
+            elif use_copy_for(len(price_data)):
+                # Very large books go through Postgres COPY, which skips SQL parsing entirely
+                copy_price_items(price_data)
+            else:
+                # One executemany INSERT in the same transaction as the price book
+                db.session.execute(
+                    PriceItem.__table__.insert(),
+                    price_data[PRICE_ITEM_COPY_COLUMNS].to_dict('records')
+                )
+            db.session.commit()
+            logging.debug(f"Created and saved price book: {new_price_book}")
             
-            logging.debug(f"Added {item_count} price items")
+            logging.debug(f"Added {len(price_data)} price items")
             logging.debug("Successfully completed price book upload")
             
-            # Clean up the temporary file
-            os.remove(filepath)
-            
-            return jsonify({"success": True, "message": f"Price book '{pricebook_name}' added successfully"})
+            return jsonify({
+                "success": True,
+                "price_book_id": pricebook_id,
+                "message": f"Price book '{pricebook_name}' added successfully"
+            })
         except Exception as e:
             db.session.rollback()  # Rollback the session in case of error
             logging.error(f"Error processing price book: {str(e)}")
@@ -435,6 +551,7 @@ def delete_price_book(price_book_id):
         # Delete the price book
         db.session.delete(price_book)
         db.session.commit()
+        invalidate_dashboard_metrics(current_user.id)
         
         return jsonify({"success": True, "message": f"Price book '{price_book.name}' deleted successfully"})
     except Exception as e:
@@ -442,6 +559,39 @@ def delete_price_book(price_book_id):
         logging.error(f"Error deleting price book: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Background PO processing - with REDIS_URL, jobs go to an RQ queue (served by
+# `rq worker po-processing`) and report progress through the shared Redis cache, so
+# any web worker can answer a status poll. Without it they run on a bounded
+# in-process thread pool and their state lives in this process's SimpleCache, so
+# only the worker that accepted the upload knows about the job (fine for the default
+# single-worker gunicorn setup; with more workers the page keeps polling through the
+# 404s from workers that don't know the job).
+PO_JOB_TIMEOUT = 60 * 60  # Keep job state for an hour
+po_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("PO_WORKER_THREADS", "4")))
+po_queue = None
+if Queue is not None and os.environ.get("REDIS_URL"):
+    po_queue = Queue("po-processing", connection=Redis.from_url(os.environ.get("REDIS_URL")),
+                     default_timeout=PO_JOB_TIMEOUT)
+
+def enqueue_po_job(job_id, *args):
+    """Starts run_po_job on the RQ queue if available, otherwise on the thread pool"""
+    if po_queue is not None:
+        # Enqueue by import path so the worker resolves it even when app.py runs as __main__
+        po_queue.enqueue("app.run_po_job", args=(job_id, *args), job_id=job_id, result_ttl=0)
+    else:
+        po_executor.submit(run_po_job, job_id, *args)
+
+def _po_job_key(job_id):
+    return f"po_job:{job_id}"
+
+def set_po_job_state(job_id, user_id, state, **data):
+    """Records the current state of a PO processing job"""
+    cache.set(_po_job_key(job_id), {"job_id": job_id, "user_id": user_id, "state": state, **data}, timeout=PO_JOB_TIMEOUT)
+
+def get_po_job_state(job_id):
+    """Returns the stored state of a PO processing job, or None if unknown"""
+    return cache.get(_po_job_key(job_id))
+
 @app.route('/api/process-po', methods=['POST'])
 @login_required
 def process_purchase_order():
@@ -460,77 +610,108 @@ def process_purchase_order():
     if file and allowed_file(file.filename, ALLOWED_EXTENSIONS_PDF):
         try:
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
             
             # Get price book data from PostgreSQL
-            price_book = PriceBook.query.get(price_book_id)
+            price_book = db.session.get(PriceBook, price_book_id)
             if not price_book:
-                os.remove(filepath)  # Clean up
                 return jsonify({"error": "Selected price book not found"}), 404
                 
             # Check if the price book belongs to the current user
             if price_book.user_id != current_user.id:
-                os.remove(filepath)  # Clean up
                 return jsonify({"error": "You don't have permission to access this price book"}), 403
             
-            # Extract data from PDF using Gemini API
-            extracted_data = extract_data_from_pdf(filepath)
-            
-            # Create a dictionary of model numbers to prices for the selected price book
-            price_book_data = {}
-            price_items = PriceItem.query.filter_by(price_book_id=price_book_id).all()
-            for item in price_items:
-                price_book_data[item.model_number] = item.price
+            # Read the upload now - the request stream is closed once we return
+            pdf_bytes = file.read()
             
-            # Prepare the price book data structure for the comparison function
+            # The job reuses the price book loaded here instead of fetching it again
             price_book_for_comparison = {
                 'id': price_book.id,
                 'name': price_book.name,
-                'data': price_book_data
+                'version': price_book.updated_at
             }
             
+            # Hand the slow work (Gemini extraction, comparison, DB writes) to a background job
+            job_id = str(uuid.uuid4())
+            set_po_job_state(job_id, current_user.id, 'PENDING')
+            enqueue_po_job(job_id, pdf_bytes, filename, price_book_for_comparison, current_user.id)
+            
+            return jsonify({
+                "job_id": job_id,
+                "status_url": url_for('po_job_status', job_id=job_id)
+            }), 202
+        except Exception as e:
+            logging.error(f"Error processing purchase order: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+    
+    return jsonify({"error": "Invalid file type. Please upload a PDF file"}), 400
+
+def run_po_job(job_id, pdf_bytes, filename, price_book, user_id):
+    """
+    Processes an uploaded purchase order in the background
+    
+    Moves the job through EXTRACTING -> COMPARING -> SAVING -> SUCCESS, or to
+    FAILURE with an error message.
+    
+    Args:
+        job_id (str): ID returned to the client
+        pdf_bytes (bytes): Contents of the uploaded PDF
+        filename (str): Sanitized upload filename, used for the PO number
+        price_book (dict): The authorized price book's id, name and version (updated_at)
+        user_id (int): Owner of the job
+    """
+    with app.app_context():
+        try:
+            # Extract data from PDF using Gemini API
+            set_po_job_state(job_id, user_id, 'EXTRACTING')
+            extracted_data = extract_data_from_pdf(io.BytesIO(pdf_bytes))
+            
+            # Load the price book once; the comparison reuses this index instead of querying again
+            set_po_job_state(job_id, user_id, 'COMPARING')
+            price_book_index = load_price_book_index(price_book['id'], price_book['version'])
+            
             # Compare extracted data with price book
-            comparison_results = compare_with_price_book(extracted_data, price_book_for_comparison)
+            comparison_results = compare_with_price_book(extracted_data, price_book, price_book_index)
             
             # Generate email report with the filename to extract PO number
-            email_report = generate_email_report(comparison_results, price_book.name, filename)
+            email_report = generate_email_report(comparison_results, price_book['name'], filename)
             
-            # Save processed PO to database with current user's ID
+            # Save processed PO to database with the uploading user's ID
+            set_po_job_state(job_id, user_id, 'SAVING')
             new_po = ProcessedPO(
                 filename=filename,
-                price_book_id=price_book_id,
-                user_id=current_user.id
+                po_number=extract_po_number_from_filename(filename),
+                price_book_id=price_book['id'],
+                user_id=user_id
             )
             db.session.add(new_po)
-            db.session.flush()  # Get the ID without committing
+            db.session.flush()  # Inserts the PO and returns its ID without committing
             
-            # Save line items
+            # Save all line items with one executemany INSERT in the same transaction
+            line_items = []
             for result in comparison_results:
                 # Ensure we have a non-null model number (use a default if needed)
                 model_number = result.get("model", "Unknown")
                 if model_number is None or model_number == "":
                     model_number = "Unknown"
                     
-                line_item = POLineItem(
-                    processed_po_id=new_po.id,
-                    model_number=model_number,
-                    po_price=float(result["po_price"]) if isinstance(result["po_price"], (int, float, str)) else 0.0,
-                    book_price=float(result["book_price"]) if "book_price" in result and isinstance(result["book_price"], (int, float, str)) else None,
-                    status=result["status"],
-                    discrepancy=float(result["discrepancy"]) if "discrepancy" in result and isinstance(result["discrepancy"], (int, float, str)) else None
-                )
-                db.session.add(line_item)
+                line_items.append({
+                    "processed_po_id": new_po.id,
+                    "model_number": model_number,
+                    "po_price": float(result["po_price"]) if isinstance(result["po_price"], (int, float, str)) else 0.0,
+                    "book_price": float(result["book_price"]) if "book_price" in result and isinstance(result["book_price"], (int, float, str)) else None,
+                    "status": result["status"],
+                    "discrepancy": float(result["discrepancy"]) if "discrepancy" in result and isinstance(result["discrepancy"], (int, float, str)) else None
+                })
+            if line_items:
+                db.session.execute(POLineItem.__table__.insert(), line_items)
             
             db.session.commit()
-            
-            # Clean up the temporary file
-            os.remove(filepath)
+            invalidate_dashboard_metrics(user_id)
             
             # Calculate total value of errors
             total_error_value = sum(result.get("error_value", 0) for result in comparison_results)
             
-            return jsonify({
+            set_po_job_state(job_id, user_id, 'SUCCESS', result={
                 "success": True,
                 "email_report": email_report,
                 "comparison_results": comparison_results,
@@ -539,44 +720,177 @@ def process_purchase_order():
         except Exception as e:
             db.session.rollback()  # Rollback in case of error
             logging.error(f"Error processing purchase order: {str(e)}")
-            return jsonify({"error": str(e)}), 500
+            set_po_job_state(job_id, user_id, 'FAILURE', error=str(e))
+
+@app.route('/api/po-status/<job_id>')
+@login_required
+def po_job_status(job_id):
+    """
+    Returns the current state of a PO processing job
     
-    return jsonify({"error": "Invalid file type. Please upload a PDF file"}), 400
+    The page polls this until the job reaches SUCCESS or FAILURE. Each poll is one
+    cache read, so a sync worker is never held for the length of a job.
+    """
+    job = get_po_job_state(job_id)
+    if not job or job['user_id'] != current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+    
+    response = jsonify({key: value for key, value in job.items() if key != 'user_id'})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-def compare_with_price_book(extracted_data, price_book):
-    results = []
-    price_data = price_book['data']
-    price_book_model_numbers = set(price_data.keys())
-    price_book_id = price_book['id']
+# Model-like tokens in PO line descriptions, including BW-prefixed models
+MODEL_TOKEN_PATTERN = re.compile(r'BW[A-Za-z0-9][-A-Za-z0-9_]{4,}[A-Za-z0-9]|[A-Za-z0-9][-A-Za-z0-9_]{4,}[A-Za-z0-9]')
+BW_MODEL_PATTERN = re.compile(r'BW[A-Z0-9][-A-Z0-9]{6,}', re.IGNORECASE)
+
+def find_models_in_text(text, model_numbers, model_lengths):
+    """
+    Finds every price book model number that appears as a substring of text
     
-    # Get all price items for this price book with their IDs to use as row numbers
-    price_items = PriceItem.query.filter_by(price_book_id=price_book_id).all()
+    Rather than testing each model number against the text, every substring of
+    the text whose length matches some model number is looked up in the set,
+    so the cost scales with the text length instead of the price book size.
     
-    # Create a dictionary to lookup price, Excel row number, and source column
+    Args:
+        text (str): Text to search, e.g. a PO line description
+        model_numbers (set): All model numbers in the price book
+        model_lengths (list): Sorted distinct lengths of those model numbers
+        
+    Returns:
+        list: Matching model numbers in order of first occurrence
+    """
+    found = {}
+    text_length = len(text)
+    for start in range(text_length):
+        for length in model_lengths:
+            end = start + length
+            if end > text_length:
+                break
+            candidate = text[start:end]
+            if candidate in model_numbers:
+                found[candidate] = None
+    return list(found)
+
+def build_model_finder(model_numbers):
+    """
+    Builds a function that finds price book model numbers inside a text
+    
+    Uses an Aho-Corasick automaton (pyahocorasick) so each description is
+    scanned once regardless of price book size, falling back to
+    find_models_in_text when the extension is not installed.
+    
+    Args:
+        model_numbers (set): All model numbers in the price book
+        
+    Returns:
+        callable: Takes a text and returns the matching model numbers
+    """
+    model_numbers = {model_number for model_number in model_numbers if model_number}
+    
+    if ahocorasick is not None and model_numbers:
+        automaton = ahocorasick.Automaton()
+        for model_number in model_numbers:
+            automaton.add_word(model_number, model_number)
+        automaton.make_automaton()
+        return lambda text: list(dict.fromkeys(model_number for _, model_number in automaton.iter(text)))
+    
+    model_lengths = sorted({len(model_number) for model_number in model_numbers})
+    return lambda text: find_models_in_text(text, model_numbers, model_lengths)
+
+def to_decimal(value):
+    """Converts a price or quantity to Decimal via its string form, or None if it is not numeric"""
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+def strip_model_prefix(model):
+    """Returns the model without a leading BW or B prefix (BW is checked first)"""
+    if model.startswith("BW"):
+        return model[2:]
+    if model.startswith("B"):
+        return model[1:]
+    return model
+
+# Everything the matcher needs from a price book, built once per price book version.
+# Item fields are stored as parallel lists addressed through model_index.
+PriceBookIndex = namedtuple('PriceBookIndex', [
+    'model_index', 'prices', 'decimal_prices', 'excel_rows', 'source_columns', 'find_models', 'dashless'
+])
+
+@functools.lru_cache(maxsize=32)
+def load_price_book_index(price_book_id, version):
+    """
+    Loads a price book's items into the lookup structures used for matching
+    
+    Cached per process. The version (the price book's updated_at) is part of
+    the key so a changed price book is reloaded rather than served stale.
+    
+    Args:
+        price_book_id (str): ID of the price book
+        version: The price book's updated_at timestamp
+        
+    Returns:
+        PriceBookIndex: Model number -> position in the price/row/column lists,
+            a model finder for descriptions, and the dash-removed model mapping
+    """
+    # Only the columns the matcher needs, as plain rows rather than ORM objects
+    price_items = db.session.query(
+        PriceItem.model_number, PriceItem.price, PriceItem.excel_row, PriceItem.source_column
+    ).filter(PriceItem.price_book_id == price_book_id).all()
+    
+    # Index price, Excel row number, and source column by model number
     # CRITICAL: Only use the FIRST occurrence of each model number to prevent wrong line matching
-    price_items_dict = {}
-    for item in price_items:
-        logging.debug(f"Item {item.model_number}: excel_row={item.excel_row}, source_column={item.source_column}")
+    model_index = {}
+    prices = []
+    decimal_prices = []
+    excel_rows = []
+    source_columns = []
+    for model_number, price, excel_row, source_column in price_items:
         # Only add if we haven't seen this model number before
-        if item.model_number not in price_items_dict:
-            price_items_dict[item.model_number] = {
-                "price": item.price,
-                "excel_row": item.excel_row,  # Keep the actual value, don't convert to "Unknown"
-                "source_column": item.source_column or "Unknown"  # Include source column info
-            }
-            logging.debug(f"FIRST occurrence of {item.model_number} at row {item.excel_row}")
+        if model_number not in model_index:
+            model_index[model_number] = len(prices)
+            # Prices are stored as exact decimals; results and JSON keep reporting floats
+            decimal_prices.append(to_decimal(price))
+            prices.append(float(price) if price is not None else None)
+            excel_rows.append(excel_row)  # Keep the actual value, don't convert to "Unknown"
+            source_columns.append(source_column or "Unknown")  # Include source column info
         else:
-            logging.warning(f"DUPLICATE model {item.model_number} at row {item.excel_row} - IGNORED (keeping first occurrence at row {price_items_dict[item.model_number]['excel_row']})")
+            logger.warning("DUPLICATE model %s at row %s - IGNORED (keeping first occurrence at row %s)", model_number, excel_row, excel_rows[model_index[model_number]])
+    
+    # Create a mapping of dash-removed models to original models from price book
+    dashless_price_book = {}
+    for original_model in model_index:
+        dashless_model = original_model.replace("-", "")
+        dashless_price_book[dashless_model] = original_model
+    
+    return PriceBookIndex(
+        model_index, prices, decimal_prices, excel_rows, source_columns,
+        build_model_finder(model_index.keys()), dashless_price_book
+    )
+
+def compare_with_price_book(extracted_data, price_book, price_book_index=None):
+    results = []
+    if price_book_index is None:
+        price_book_index = load_price_book_index(price_book['id'], price_book['version'])
+    model_index = price_book_index.model_index
+    find_price_book_models = price_book_index.find_models
+    dashless_price_book = price_book_index.dashless
+    
+    # Coerce every extracted price and quantity once up front
+    po_prices = [to_decimal(item.get("price")) for item in extracted_data]
+    quantities = [to_decimal(item.get("quantity", 1)) for item in extracted_data]
     
     for po_line_number, item in enumerate(extracted_data, 1):
-        logging.debug(f"PO line {po_line_number}: Raw extracted data = {item}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PO line %s: Raw extracted data = %s", po_line_number, item)
         
         # Ensure there's always a valid model number (never null)
         model_number = item.get("model", "")
         if model_number is None or model_number == "":
             model_number = "Unknown Item"
             
-        logging.debug(f"PO line {po_line_number}: Primary model = '{model_number}'")
+        logger.debug("PO line %s: Primary model = '%s'", po_line_number, model_number)
         
         result = {
             "model": model_number,
@@ -609,115 +923,61 @@ def compare_with_price_book(extracted_data, price_book):
         # Also search for model numbers in the description using regex
         if "description" in item and item["description"]:
             description = item["description"]
-            import re
             # Find model-like patterns in description, including BW-prefixed models
-            model_patterns = re.findall(r'BW[A-Za-z0-9][-A-Za-z0-9_]{4,}[A-Za-z0-9]|[A-Za-z0-9][-A-Za-z0-9_]{4,}[A-Za-z0-9]', description)
+            model_patterns = MODEL_TOKEN_PATTERN.findall(description)
             all_potential_models.extend(model_patterns)
             
             # Also check for known model numbers from price book
-            for model_number in price_book_model_numbers:
-                if model_number in description:
-                    all_potential_models.append(model_number)
+            all_potential_models.extend(find_price_book_models(description))
             
             # Specifically look for BW-prefixed patterns in the description
-            bw_patterns = re.findall(r'BW[A-Z0-9][-A-Z0-9]{6,}', description, re.IGNORECASE)
+            bw_patterns = BW_MODEL_PATTERN.findall(description)
             all_potential_models.extend(bw_patterns)
         
         # Remove duplicates while preserving order
-        seen = set()
-        unique_models = []
-        for model in all_potential_models:
-            if model not in seen:
-                seen.add(model)
-                unique_models.append(model)
+        unique_models = list(dict.fromkeys(all_potential_models))
         
 
         
-        logging.debug(f"PO line {po_line_number}: All potential models found: {unique_models}")
+        logger.debug("PO line %s: All potential models found: %s", po_line_number, unique_models)
         
 
-        # STEP 1: Direct exact matches first - use any model that matches exactly as-is
-        for model in unique_models:
-            if model in price_items_dict:
-                matched_model = model
-                logging.info(f"PO line {po_line_number}: STEP 1 - Direct exact match '{model}'")
-                break
+        # STEP 1: Direct exact matches first - use the first model that matches exactly as-is
+        matched_model = next((model for model in unique_models if model in model_index), None)
+        if matched_model:
+            logger.info("PO line %s: STEP 1 - Direct exact match '%s'", po_line_number, matched_model)
         
         # STEP 2: BW prefix search - for extracted BW models, remove BW and check price book
         if not matched_model:
-            for model in unique_models:
-                if model.startswith("BW"):
-                    base_model = model[2:]  # Remove "BW" prefix
-                    if base_model in price_items_dict:
-                        matched_model = model  # Show BW model but map to base price
-                        logging.info(f"PO line {po_line_number}: STEP 2 - BW model '{model}' maps to price book '{base_model}'")
-                        break
+            matched_model = next((model for model in unique_models
+                                  if model.startswith("BW") and model[2:] in model_index), None)
+            if matched_model:
+                # Show BW model but map to base price
+                logger.info("PO line %s: STEP 2 - BW model '%s' maps to price book '%s'", po_line_number, matched_model, matched_model[2:])
         
         # STEP 3: B prefix search - for extracted B models, remove B and check price book
         if not matched_model:
-            for model in unique_models:
-                if model.startswith("B") and not model.startswith("BW"):
-                    base_model = model[1:]  # Remove "B" prefix
-                    if base_model in price_items_dict:
-                        matched_model = model  # Show B model but map to base price
-                        logging.info(f"PO line {po_line_number}: STEP 3 - B model '{model}' maps to price book '{base_model}'")
-                        break
+            matched_model = next((model for model in unique_models
+                                  if model.startswith("B") and not model.startswith("BW") and model[1:] in model_index), None)
+            if matched_model:
+                # Show B model but map to base price
+                logger.info("PO line %s: STEP 3 - B model '%s' maps to price book '%s'", po_line_number, matched_model, matched_model[1:])
         
-        # STEP 4: Dash-removal fallback search - try matching without dashes
+        # STEP 4: Dash-removal fallback search - try each model, then its BW/B base, without dashes.
+        # dashless_price_book is keyed by the dash-stripped price book model, so a hit is always
+        # identical to the price book model apart from dashes.
         if not matched_model:
-            # Create a mapping of dash-removed models to original models from price book
-            dashless_price_book = {}
-            for original_model in price_items_dict.keys():
-                dashless_model = original_model.replace("-", "")
-                dashless_price_book[dashless_model] = original_model
-            
-            # Try all extracted models with dashes removed
             for model in unique_models:
-                dashless_extracted = model.replace("-", "")
-                if dashless_extracted in dashless_price_book:
-                    original_price_book_model = dashless_price_book[dashless_extracted]
-                    # CRITICAL: Only allow if they are EXACTLY the same when dashes are removed
-                    # The only difference should be the presence/absence of dashes
-                    if dashless_extracted == original_price_book_model.replace("-", ""):
+                base_model = strip_model_prefix(model)
+                for candidate in dict.fromkeys((model, base_model)):
+                    original_price_book_model = dashless_price_book.get(candidate.replace("-", ""))
+                    if original_price_book_model is not None:
                         matched_model = model  # Show original extracted model
                         lookup_model_for_dash = original_price_book_model  # Use original price book model
-                        logging.info(f"PO line {po_line_number}: STEP 4 - Dash-removal match '{model}' maps to price book '{lookup_model_for_dash}'")
+                        logger.info("PO line %s: STEP 4 - Dash-removal match '%s' (base: '%s') maps to price book '%s'", po_line_number, model, candidate, lookup_model_for_dash)
                         break
-                    else:
-                        logging.warning(f"PO line {po_line_number}: REJECTED dash-removal match '{model}' to '{original_price_book_model}' - not identical when dashes removed")
-                        continue
-                
-                # Also try BW prefix removal + dash removal
-                if model.startswith("BW"):
-                    base_model_no_bw = model[2:]  # Remove BW
-                    dashless_base = base_model_no_bw.replace("-", "")
-                    if dashless_base in dashless_price_book:
-                        original_price_book_model = dashless_price_book[dashless_base]
-                        # CRITICAL: Only allow if they are EXACTLY the same when dashes are removed
-                        if dashless_base == original_price_book_model.replace("-", ""):
-                            matched_model = model  # Show BW model
-                            lookup_model_for_dash = original_price_book_model
-                            logging.info(f"PO line {po_line_number}: STEP 4 - BW + dash-removal match '{model}' (base: '{base_model_no_bw}') maps to price book '{lookup_model_for_dash}'")
-                            break
-                        else:
-                            logging.warning(f"PO line {po_line_number}: REJECTED BW + dash-removal match '{model}' to '{original_price_book_model}' - not identical when dashes removed")
-                            continue
-                
-                # Also try B prefix removal + dash removal
-                if model.startswith("B") and not model.startswith("BW"):
-                    base_model_no_b = model[1:]  # Remove B
-                    dashless_base = base_model_no_b.replace("-", "")
-                    if dashless_base in dashless_price_book:
-                        original_price_book_model = dashless_price_book[dashless_base]
-                        # CRITICAL: Only allow if they are EXACTLY the same when dashes are removed
-                        if dashless_base == original_price_book_model.replace("-", ""):
-                            matched_model = model  # Show B model
-                            lookup_model_for_dash = original_price_book_model
-                            logging.info(f"PO line {po_line_number}: STEP 4 - B + dash-removal match '{model}' (base: '{base_model_no_b}') maps to price book '{lookup_model_for_dash}'")
-                            break
-                        else:
-                            logging.warning(f"PO line {po_line_number}: REJECTED B + dash-removal match '{model}' to '{original_price_book_model}' - not identical when dashes removed")
-                            continue
+                if matched_model:
+                    break
         
         # STEP 5: If no matches found, it will be marked as "NOT FOUND"
         
@@ -729,7 +989,7 @@ def compare_with_price_book(extracted_data, price_book):
         if matched_model:
             # Update the result model to show the matched model, not the original extracted model
             result["model"] = matched_model
-            logging.debug(f"PO line {po_line_number}: Found match for '{matched_model}'")
+            logger.debug("PO line %s: Found match for '%s'", po_line_number, matched_model)
             
             # Handle BW/B prefixed models and dash-removal matches
             lookup_model = matched_model
@@ -737,42 +997,37 @@ def compare_with_price_book(extracted_data, price_book):
             # Check if we used dash-removal matching (lookup_model_for_dash was set)
             if lookup_model_for_dash is not None:
                 lookup_model = lookup_model_for_dash
-            elif matched_model.startswith("BW"):
-                # For BW models, always look up price using base model (without BW)
-                lookup_model = matched_model[2:]  # Remove BW prefix for price lookup
-            elif matched_model.startswith("B") and not matched_model.startswith("BW"):
-                # For B models, always look up price using base model (without B)
-                lookup_model = matched_model[1:]  # Remove B prefix for price lookup
-            
-            if lookup_model not in price_items_dict:
-                logging.error(f"PO line {po_line_number}: lookup_model '{lookup_model}' not found in price book")
+            else:
+                # For BW/B models, always look up price using the base model (prefix removed)
+                lookup_model = strip_model_prefix(matched_model)
+            
+            item_position = model_index.get(lookup_model)
+            if item_position is None:
+                logger.error("PO line %s: lookup_model '%s' not found in price book", po_line_number, lookup_model)
                 result["status"] = "Lookup Error"
                 results.append(result)
                 continue
                 
-            item_data = price_items_dict[lookup_model]
-            book_price = item_data["price"]
-            result["book_price"] = book_price
-            result["price_book_row"] = item_data["excel_row"]
-            result["source_column"] = item_data["source_column"]
+            result["book_price"] = price_book_index.prices[item_position]
+            result["price_book_row"] = price_book_index.excel_rows[item_position]
+            result["source_column"] = price_book_index.source_columns[item_position]
             
-            # Compare prices
-            try:
-                po_price = float(item["price"])
-                book_price_float = float(book_price)
-                quantity = float(result["quantity"])
-                
-                if po_price == book_price_float:
-                    result["status"] = "Match"
-                else:
-                    result["status"] = "Mismatch"
-                    price_diff = abs(po_price - book_price_float)
-                    result["discrepancy"] = price_diff
-                    # Calculate total error value: price difference * quantity
-                    result["error_value"] = price_diff * quantity
-            except (ValueError, TypeError):
-                # Handle case where price might not be convertible to float
+            # Compare prices exactly as decimals so e.g. 10.15 vs 10.10 gives a 0.05 discrepancy
+            po_price = po_prices[po_line_number - 1]
+            quantity = quantities[po_line_number - 1]
+            book_price_decimal = price_book_index.decimal_prices[item_position]
+            
+            if po_price is None or quantity is None or book_price_decimal is None:
+                # Handle case where price might not be numeric
                 result["status"] = "Price Format Error"
+            elif po_price == book_price_decimal:
+                result["status"] = "Match"
+            else:
+                result["status"] = "Mismatch"
+                price_diff = abs(po_price - book_price_decimal)
+                result["discrepancy"] = float(price_diff)
+                # Calculate total error value: price difference * quantity
+                result["error_value"] = float(price_diff * quantity)
         else:
             result["status"] = "Model Not Found"
         
@@ -780,6 +1035,15 @@ def compare_with_price_book(extracted_data, price_book):
     
     return results
 
+# Common patterns in PO filenames, compiled once and tried in order
+PO_FILENAME_PATTERNS = [
+    re.compile(r'P0*(\d+)', re.IGNORECASE),  # Matches P0000123 or P123
+    re.compile(r'PO[-_]?0*(\d+)', re.IGNORECASE),  # Matches PO-123, PO_123, PO123
+    re.compile(r'Purchase[-_]?Order[-_]?0*(\d+)', re.IGNORECASE),  # Matches Purchase-Order-123
+    re.compile(r'Order[-_]?0*(\d+)', re.IGNORECASE),  # Matches Order-123
+    re.compile(r'(\d{5,})'),  # Matches any sequence of 5+ digits (likely a PO number)
+]
+
 def extract_po_number_from_filename(filename):
     """
     Attempts to extract a PO number from the PDF filename
@@ -794,23 +1058,18 @@ def extract_po_number_from_filename(filename):
     base_name = os.path.basename(filename)
     base_name = os.path.splitext(base_name)[0]
     
-    # Common patterns in PO filenames
-    po_patterns = [
-        r'P0*(\d+)',  # Matches P0000123 or P123
-        r'PO[-_]?0*(\d+)',  # Matches PO-123, PO_123, PO123
-        r'Purchase[-_]?Order[-_]?0*(\d+)',  # Matches Purchase-Order-123
-        r'Order[-_]?0*(\d+)',  # Matches Order-123
-        r'(\d{5,})',  # Matches any sequence of 5+ digits (likely a PO number)
-    ]
-    
-    for pattern in po_patterns:
-        match = re.search(pattern, base_name, re.IGNORECASE)
+    for pattern in PO_FILENAME_PATTERNS:
+        match = pattern.search(base_name)
         if match:
             return match.group(1)
             
     # If no pattern matches, use the filename without extension as fallback
     return base_name
 
+EMAIL_REPORT_FOOTER = """
+Please revise these items and resubmit at your convenience. We truly appreciate your business.
+"""
+
 def generate_email_report(comparison_results, price_book_name, filename="Unknown PO"):
     # Extract PO number from filename if available
     po_number = extract_po_number_from_filename(filename)
@@ -823,22 +1082,25 @@ I have reviewed your purchase order ({po_number}). The following discrepancies h
 
 """
     
-    # Get all items with issues (mismatches and model not found)
-    problem_items = [item for item in comparison_results if item['status'] in ["Mismatch", "Model Not Found"]]
-    
+    # Collect lines for items with issues (mismatches and model not found) in a single pass
     # Use actual PO line numbers, not a counter
-    for item in problem_items:
-        try:
-            po_price = float(item['po_price'])
-            po_price_formatted = f"${po_price:.2f}"
-        except (ValueError, TypeError):
-            po_price_formatted = f"${item['po_price']}"
-            
+    problem_lines = []
+    for item in comparison_results:
+        status = item['status']
+        if status not in ("Mismatch", "Model Not Found"):
+            continue
+        
         # Get the actual PO line number
         po_line = item.get('po_line_number', 'Unknown')
         
         # Format the message based on the status
-        if item['status'] == "Mismatch":
+        if status == "Mismatch":
+            try:
+                po_price = float(item['po_price'])
+                po_price_formatted = f"${po_price:.2f}"
+            except (ValueError, TypeError):
+                po_price_formatted = f"${item['po_price']}"
+            
             try:
                 book_price = float(item['book_price'])
                 book_price_formatted = f"${book_price:.2f}"
@@ -847,19 +1109,15 @@ I have reviewed your purchase order ({po_number}). The following discrepancies h
             
             # Include source column information if available
             source_info = f" (Row {item['price_book_row']})" if item.get('price_book_row') else ""
-            email_text += f"PO Line {po_line} - {item['model']} - PO Price {po_price_formatted} - Price Book {book_price_formatted}{source_info}\n"
-        elif item['status'] == "Model Not Found":
-            email_text += f"PO Line {po_line} - {item['model']} - Model not found in price book\n"
+            problem_lines.append(f"PO Line {po_line} - {item['model']} - PO Price {po_price_formatted} - Price Book {book_price_formatted}{source_info}\n")
+        else:
+            problem_lines.append(f"PO Line {po_line} - {item['model']} - Model not found in price book\n")
     
     # If there are no problem items
-    if not problem_items:
-        email_text += "No price discrepancies found. All prices match our records.\n"
-    
-    email_text += """
-Please revise these items and resubmit at your convenience. We truly appreciate your business.
-"""
+    if not problem_lines:
+        problem_lines.append("No price discrepancies found. All prices match our records.\n")
     
-    return email_text
+    return email_text + "".join(problem_lines) + EMAIL_REPORT_FOOTER
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,35 @@
+"""
+One-off schema update for PriceBook.content_sha256
+Adds the upload hash column to existing databases; older books stay unhashed
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db
+from models import PriceBook
+
+def add_price_book_sha256():
+    """Add the content_sha256 column and its index"""
+    table = PriceBook.__table__.name
+    with app.app_context():
+        # db.create_all() does not alter existing tables, so add the column here
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_sha256 VARCHAR(64)"))
+        db.session.execute(text(f"CREATE INDEX IF NOT EXISTS ix_price_book_content_sha256 ON {table} (content_sha256)"))
+        db.session.commit()
+        print("  ✅ Added content_sha256 to price books")
+
+def main():
+    """Main schema update function"""
+    print("🔄 Adding price book upload hashes...")
+    add_price_book_sha256()
+    print("\n🎉 Schema update complete")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,39 @@
+"""
+One-off index migration for PriceItem
+Replaces the (model_number, price_book_id) index with one led by price_book_id
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db
+from models import PriceItem
+
+def add_price_item_book_index():
+    """Build the new index without locking writes, then drop the old one"""
+    table = PriceItem.__table__.name
+    with app.app_context():
+        # CONCURRENTLY cannot run inside a transaction block
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_priceitem_book_model ON {table} (price_book_id, model_number)"
+            ))
+            print("  ✅ Created ix_priceitem_book_model")
+            
+            connection.execute(text("DROP INDEX CONCURRENTLY IF EXISTS idx_model_pricebook"))
+            print("  ✅ Dropped idx_model_pricebook")
+
+def main():
+    """Main index migration function"""
+    print("🔄 Migrating price item index...")
+    add_price_item_book_index()
+    print("\n🎉 Index migration complete")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,48 @@
+"""
+One-off backfill for ProcessedPO.po_number
+Adds the column to existing databases and fills it from the stored filename
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db, extract_po_number_from_filename
+from models import ProcessedPO
+
+def backfill_po_numbers(batch_size: int = 500) -> int:
+    """Populate po_number for every ProcessedPO that does not have one yet"""
+    with app.app_context():
+        # db.create_all() does not alter existing tables, so add the column here
+        db.session.execute(text("ALTER TABLE processed_po ADD COLUMN IF NOT EXISTS po_number VARCHAR(255)"))
+        db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_processed_po_po_number ON processed_po (po_number)"))
+        db.session.commit()
+
+        updated = 0
+        while True:
+            pos = ProcessedPO.query.filter(ProcessedPO.po_number.is_(None)).limit(batch_size).all()
+            if not pos:
+                break
+
+            for po in pos:
+                po.po_number = extract_po_number_from_filename(po.filename)
+            db.session.commit()
+
+            updated += len(pos)
+            print(f"  ✅ Backfilled {updated} processed POs")
+
+        return updated
+
+def main():
+    """Main backfill function"""
+    print("🔄 Backfilling PO numbers...")
+    updated = backfill_po_numbers()
+    print(f"\n🎉 Backfill complete - {updated} processed POs updated")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
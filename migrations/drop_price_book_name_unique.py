@@ -0,0 +1,41 @@
+"""
+One-off schema update for PriceBook.name uniqueness
+Databases created before names were scoped per user still carry a global
+unique constraint on price_book.name; replace it with the (name, user_id) one
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db
+from models import PriceBook
+
+def drop_price_book_name_unique():
+    """Drop the global name constraint and make sure the per-user one exists"""
+    table = PriceBook.__table__.name
+    with app.app_context():
+        db.session.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_name_key"))
+        
+        # Postgres has no ADD CONSTRAINT IF NOT EXISTS, so check the catalog first
+        exists = db.session.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = '_user_pricebook_uc'")
+        ).scalar()
+        if not exists:
+            db.session.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT _user_pricebook_uc UNIQUE (name, user_id)"))
+        db.session.commit()
+        print("  ✅ Price book names are now unique per user")
+
+def main():
+    """Main schema update function"""
+    print("🔄 Scoping price book name uniqueness to each user...")
+    drop_price_book_name_unique()
+    print("\n🎉 Schema update complete")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -5,9 +5,22 @@ Handles the data migration while maintaining referential integrity
 
 import sys
 import os
+import io
+import csv
+import json
+import threading
 from pathlib import Path
 from uuid import uuid4
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from sqlalchemy.orm import selectinload
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
@@ -20,10 +33,49 @@ from app import app, db
 from models import User as SQLUser, PriceBook as SQLPriceBook, PriceItem as SQLPriceItem, ProcessedPO as SQLProcessedPO, POLineItem as SQLPOLineItem
 from models.supabase_models import Organization, User, PriceBook, PriceItem, ProcessedPO, POLineItem
 from repositories.organization_repository import OrganizationRepository
-from repositories.price_book_repository import PriceBookRepository
 from utils.supabase_client import get_supabase_admin_client
 from utils.db_adapter import get_db_adapter
 
+# Rows per Supabase insert request, kept well under PostgREST payload limits
+MIGRATION_BATCH_SIZE = 500
+PRICE_ITEM_BATCH_SIZE = 1000  # Price item rows are narrow, so larger batches stay under the limit
+# Source rows fetched per round-trip and buffered before each bulk load
+STREAM_BATCH_SIZE = 10000
+
+# Concurrent insert requests, kept below the Supabase pooler's connection limit
+MIGRATION_WORKERS = int(os.environ.get("MIGRATION_WORKERS", "8"))
+
+# Direct Postgres connection string for COPY-loading the largest tables (optional)
+SUPABASE_DB_URL = os.environ.get("SUPABASE_DB_URL")
+
+# Progress saved after each batch so a failed run resumes where it stopped;
+# delete this directory to start a migration from scratch
+CHECKPOINT_DIR = Path(os.environ.get("MIGRATION_CHECKPOINT_DIR", ".migration_checkpoints"))
+
+def _chunks(rows: list, size: int):
+    """Yield successive slices of at most size rows"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _save_checkpoint(name: str, data):
+    """Atomically write one checkpoint file, so a crash never leaves it half-written"""
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    path = CHECKPOINT_DIR / f"{name}.json"
+    tmp_path = path.with_suffix('.json.tmp')
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+def _load_checkpoint(name: str, default=None):
+    """Read a checkpoint written by a previous run, or default if there is none"""
+    path = CHECKPOINT_DIR / f"{name}.json"
+    if not path.exists():
+        return default
+    return json.loads(path.read_text())
+
+def _load_id_mapping(name: str) -> dict:
+    """Read a checkpointed SQLAlchemy ID -> Supabase UUID mapping (JSON keys are strings)"""
+    return {int(sql_id): uuid for sql_id, uuid in _load_checkpoint(name, {}).items()}
+
 class DataMigrator:
     """Handles data migration from SQLAlchemy to Supabase"""
     
@@ -31,7 +83,6 @@ class DataMigrator:
         self.client = get_supabase_admin_client()
         self.db_adapter = get_db_adapter()
         self.org_repo = OrganizationRepository()
-        self.price_book_repo = PriceBookRepository()
         
         # Migration tracking
         self.migration_stats = {
@@ -45,13 +96,263 @@ class DataMigrator:
         }
         
         # ID mapping for foreign key relationships
-        self.user_id_mapping = {}  # SQLAlchemy ID -> Supabase UUID
-        self.price_book_id_mapping = {}  # SQLAlchemy ID -> Supabase UUID
-        self.processed_po_id_mapping = {}  # SQLAlchemy ID -> Supabase UUID
+        # UUIDs are kept in their string form so row builders don't re-stringify them per row
+        # Pre-populated from checkpoints so a retried run skips rows that are already migrated
+        self.user_id_mapping = _load_id_mapping('user_id_mapping')  # SQLAlchemy ID -> Supabase UUID (str)
+        self.price_book_id_mapping = _load_id_mapping('price_book_id_mapping')  # SQLAlchemy ID -> Supabase UUID (str)
+        self.processed_po_id_mapping = _load_id_mapping('processed_po_id_mapping')  # SQLAlchemy ID -> Supabase UUID (str)
+        
+        # Phases finished by earlier runs, and price books whose items are all loaded
+        self.completed_phases = set(_load_checkpoint('completed_phases', []))
+        self.price_item_book_ids = set(_load_checkpoint('price_item_book_ids', []))
+        # Price items and processed POs checkpoint from separate threads
+        self._checkpoint_lock = threading.Lock()
+        
+        self.resuming = bool(
+            self.completed_phases or self.user_id_mapping or self.price_book_id_mapping
+            or self.processed_po_id_mapping or self.price_item_book_ids
+        )
+    
+    def _checkpoint_mapping(self, name: str):
+        """Persist one of the ID mappings, e.g. 'user_id_mapping'"""
+        with self._checkpoint_lock:
+            _save_checkpoint(name, {str(sql_id): uuid for sql_id, uuid in getattr(self, name).items()})
+    
+    def _complete_phase(self, phase: str):
+        """Record a phase as done so later runs skip it"""
+        with self._checkpoint_lock:
+            self.completed_phases.add(phase)
+            _save_checkpoint('completed_phases', sorted(self.completed_phases))
+    
+    def _insert_chunk(self, table: str, chunk: list, describe_row) -> tuple:
+        """
+        Insert one chunk, retrying it row by row if the bulk request fails so
+        errors are still attributed to individual records
+        
+        Every row carries its pre-generated UUID, so inserts ask PostgREST not to
+        echo the rows back (return=minimal); failures surface as exceptions
+        
+        Returns (inserted rows, error messages)
+        """
+        try:
+            self.client.table(table).insert(chunk, returning='minimal').execute()
+            return chunk, []
+        except Exception as e:
+            print(f"  ⚠️  Bulk insert into {table} failed ({e}), retrying row by row")
+        
+        inserted = []
+        errors = []
+        for row in chunk:
+            try:
+                self.client.table(table).insert(row, returning='minimal').execute()
+                inserted.append(row)
+            except Exception as row_error:
+                error_msg = f"Error migrating {describe_row(row)}: {row_error}"
+                errors.append(error_msg)
+                print(f"  ❌ {error_msg}")
+        return inserted, errors
+    
+    def _insert_in_chunks(self, table: str, rows: list, describe_row, chunk_size: int = MIGRATION_BATCH_SIZE) -> list:
+        """
+        Insert rows with one request per chunk, sending up to MIGRATION_WORKERS
+        chunks concurrently since the load is bound by request round-trips
+        
+        Returns the rows that were inserted
+        """
+        inserted = []
+        with ThreadPoolExecutor(max_workers=MIGRATION_WORKERS) as executor:
+            results = executor.map(
+                lambda chunk: self._insert_chunk(table, chunk, describe_row), _chunks(rows, chunk_size)
+            )
+            # Stats are only touched here, on the calling thread
+            for chunk_inserted, chunk_errors in results:
+                inserted.extend(chunk_inserted)
+                self.migration_stats['errors'].extend(chunk_errors)
+        return inserted
+    
+    def _copy_records(self, table: str, rows: list):
+        """COPY rows straight into the Supabase Postgres database, bypassing PostgREST"""
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        # Write NULL as \N so empty strings are not read back as NULL
+        csv.writer(buffer).writerows(
+            ['\\N' if row[column] is None else row[column] for column in columns] for row in rows
+        )
+        buffer.seek(0)
+        
+        connection = psycopg2.connect(SUPABASE_DB_URL)
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+    
+    def _bulk_load(self, table: str, rows: list, describe_row, chunk_size: int = PRICE_ITEM_BATCH_SIZE) -> list:
+        """
+        Load rows with COPY over a direct connection when SUPABASE_DB_URL is set,
+        otherwise (or if COPY fails) with chunked PostgREST inserts
+        
+        Returns the rows that were inserted
+        """
+        if SUPABASE_DB_URL and psycopg2 is not None and rows:
+            try:
+                self._copy_records(table, rows)
+                return rows
+            except Exception as e:
+                # COPY is all-or-nothing, so retrying through PostgREST cannot duplicate rows
+                print(f"  ⚠️  COPY into {table} failed ({e}), falling back to API inserts")
+        return self._insert_in_chunks(table, rows, describe_row, chunk_size=chunk_size)
+    
+    def _user_row(self, sql_user, org_id: str) -> dict:
+        """Supabase users row for a SQLAlchemy user, with a new UUID"""
+        # Note: In real migration, you'd need to handle Supabase Auth user creation
+        # For now, we'll create the profile record assuming Auth user exists
+        return {
+            'id': str(uuid4()),
+            'organization_id': org_id,
+            'email': sql_user.email,
+            'username': sql_user.username,
+            'role': 'admin' if sql_user.is_admin else 'member',
+            'is_admin': sql_user.is_admin,
+            'is_active': True
+        }
+    
+    def _price_book_row(self, sql_pb, org_id: str) -> dict:
+        """Supabase price_books row, mapped to the migrated user (callers skip unmapped users)"""
+        return {
+            'id': str(uuid4()),
+            'organization_id': org_id,
+            'name': sql_pb.name,
+            'user_id': self.user_id_mapping[sql_pb.user_id]
+        }
+    
+    def _price_item_row(self, sql_item) -> dict:
+        """Supabase price_items row, mapped to the migrated price book"""
+        return {
+            'id': str(uuid4()),
+            'price_book_id': self.price_book_id_mapping[sql_item.price_book_id],
+            'model_number': sql_item.model_number,
+            # Numeric columns come back as Decimal; send the exact text rather than a float
+            'price': str(sql_item.price),
+            'source_column': sql_item.source_column,
+            'excel_row': sql_item.excel_row
+        }
+    
+    def _processed_po_row(self, sql_po, org_id: str) -> dict:
+        """Supabase processed_pos row, mapped to the migrated user and price book"""
+        return {
+            'id': str(uuid4()),
+            'organization_id': org_id,
+            'filename': sql_po.filename,
+            'price_book_id': self.price_book_id_mapping[sql_po.price_book_id],
+            'user_id': self.user_id_mapping[sql_po.user_id],
+            'processed_at': sql_po.processed_at.isoformat() if sql_po.processed_at else None
+        }
+    
+    def _po_line_item_row(self, sql_item, new_po_id: str) -> dict:
+        """Supabase po_line_items row for the migrated PO"""
+        return {
+            'id': str(uuid4()),
+            'processed_po_id': new_po_id,
+            'model_number': sql_item.model_number,
+            'po_price': str(sql_item.po_price),
+            'book_price': str(sql_item.book_price) if sql_item.book_price is not None else None,
+            'status': sql_item.status,
+            'discrepancy': str(sql_item.discrepancy) if sql_item.discrepancy is not None else None
+        }
+    
+    def build_migration_bundle(self, default_org: Organization) -> dict:
+        """Build every row client-side and fill the ID mappings for the bundled migration"""
+        bundle = {'users': [], 'price_books': [], 'price_items': [], 'processed_pos': [], 'po_line_items': []}
+        org_id = str(default_org.id)
+        
+        for sql_user in SQLUser.query.all():
+            user_data = self._user_row(sql_user, org_id)
+            self.user_id_mapping[sql_user.id] = user_data['id']
+            bundle['users'].append(user_data)
+        
+        for sql_pb in SQLPriceBook.query.all():
+            price_book_data = self._price_book_row(sql_pb, org_id)
+            self.price_book_id_mapping[sql_pb.id] = price_book_data['id']
+            bundle['price_books'].append(price_book_data)
+        
+        bundle['price_items'] = [self._price_item_row(sql_item) for sql_item in SQLPriceItem.query.all()]
+        
+        skipped = 0
+        for sql_po in SQLProcessedPO.query.options(selectinload(SQLProcessedPO.line_items)).all():
+            if sql_po.price_book_id not in self.price_book_id_mapping or sql_po.user_id not in self.user_id_mapping:
+                skipped += 1
+                continue
+            po_data = self._processed_po_row(sql_po, org_id)
+            self.processed_po_id_mapping[sql_po.id] = po_data['id']
+            bundle['processed_pos'].append(po_data)
+            bundle['po_line_items'].extend(
+                self._po_line_item_row(sql_item, po_data['id']) for sql_item in sql_po.line_items
+            )
+        if skipped:
+            print(f"  ⚠️  Skipped {skipped} POs - price book or user not found")
+        
+        return bundle
+    
+    def migrate_bundle(self, default_org: Organization) -> bool:
+        """
+        Migrate all users, price books, POs and their children in one Postgres
+        transaction through the migrate_bundle RPC
+        
+        Returns False (with the ID mappings reset) if the RPC is unavailable or
+        fails, so the caller can fall back to per-table inserts. Raises if the RPC
+        never answered, since it may still have committed.
+        """
+        print("\n🔄 Migrating all data in one transaction...")
+        
+        try:
+            bundle = self.build_migration_bundle(default_org)
+            response = self.client.rpc('migrate_bundle', {'payload': bundle}).execute()
+            counts = response.data or {}
+            
+            self.migration_stats['users_migrated'] += counts.get('users', 0)
+            self.migration_stats['price_books_migrated'] += counts.get('price_books', 0)
+            self.migration_stats['price_items_migrated'] += counts.get('price_items', 0)
+            self.migration_stats['processed_pos_migrated'] += counts.get('processed_pos', 0)
+            self.migration_stats['po_line_items_migrated'] += counts.get('po_line_items', 0)
+            print(f"  ✅ Migrated bundle: {counts}")
+            
+            for name in ('user_id_mapping', 'price_book_id_mapping', 'processed_po_id_mapping'):
+                self._checkpoint_mapping(name)
+            for phase in ('users', 'price_books', 'price_items', 'processed_pos'):
+                self._complete_phase(phase)
+            return True
+            
+        except httpx.TransportError as e:
+            # No response (timeout, dropped connection): the transaction may have committed
+            # anyway, and re-inserting table by table would collide with or duplicate it
+            raise RuntimeError(
+                f"migrate_bundle did not respond ({e!r}) and may still have committed - "
+                "check the Supabase tables before running the migration again"
+            ) from e
+        except Exception as e:
+            # The server answered with an error; the RPC runs in a single transaction,
+            # so nothing was written
+            print(f"  ⚠️  Bundled migration failed ({e}), falling back to per-table inserts")
+            self.user_id_mapping.clear()
+            self.price_book_id_mapping.clear()
+            self.processed_po_id_mapping.clear()
+            return False
     
     def create_default_organization(self) -> Organization:
         """Create a default organization for existing users"""
         try:
+            org_id = _load_checkpoint('organization_id')
+            if org_id:
+                org = self.org_repo.get_by_id(org_id)
+                if org:
+                    print(f"✅ Resuming with default organization: {org.name}")
+                    return org
+            
             org_data = {
                 'id': str(uuid4()),
                 'name': 'OrderGuard Legacy Organization',
@@ -65,6 +366,7 @@ class DataMigrator:
             
             org = self.org_repo.create(org_data)
             if org:
+                _save_checkpoint('organization_id', str(org.id))
                 self.migration_stats['organizations_created'] += 1
                 print(f"✅ Created default organization: {org.name}")
                 return org
@@ -80,45 +382,40 @@ class DataMigrator:
     def migrate_users(self, default_org: Organization):
         """Migrate users from SQLAlchemy to Supabase"""
         print("\n🔄 Migrating users...")
+        if 'users' in self.completed_phases:
+            print("  ⏭️  Already migrated by a previous run")
+            return
         
         try:
-            with app.app_context():
-                sql_users = SQLUser.query.all()
-                print(f"Found {len(sql_users)} users to migrate")
-                
-                for sql_user in sql_users:
-                    try:
-                        # Generate new UUID for Supabase
-                        new_user_id = uuid4()
-                        
-                        # Note: In real migration, you'd need to handle Supabase Auth user creation
-                        # For now, we'll create the profile record assuming Auth user exists
-                        user_data = {
-                            'id': str(new_user_id),
-                            'organization_id': str(default_org.id),
-                            'email': sql_user.email,
-                            'username': sql_user.username,
-                            'role': 'admin' if sql_user.is_admin else 'member',
-                            'is_admin': sql_user.is_admin,
-                            'is_active': True
-                        }
-                        
-                        # Insert directly using client (bypassing RLS for migration)
-                        response = self.client.table('users').insert(user_data).execute()
-                        
-                        if response.data:
-                            # Store mapping for foreign key relationships
-                            self.user_id_mapping[sql_user.id] = new_user_id
-                            self.migration_stats['users_migrated'] += 1
-                            print(f"  ✅ Migrated user: {sql_user.username}")
-                        else:
-                            raise Exception("No data returned from insert")
-                            
-                    except Exception as e:
-                        error_msg = f"Error migrating user {sql_user.username}: {e}"
-                        self.migration_stats['errors'].append(error_msg)
-                        print(f"  ❌ {error_msg}")
-                        
+            sql_users = [u for u in SQLUser.query.all() if u.id not in self.user_id_mapping]
+            print(f"Found {len(sql_users)} users to migrate")
+            org_id = str(default_org.id)
+            
+            # Build every profile row up front with pre-generated UUIDs
+            sql_user_ids = {}  # Supabase row ID -> SQLAlchemy ID
+            users_payload = []
+            for sql_user in sql_users:
+                user_data = self._user_row(sql_user, org_id)
+                users_payload.append(user_data)
+                sql_user_ids[user_data['id']] = sql_user.id
+            
+            # Insert directly using client (bypassing RLS for migration)
+            inserted = self._bulk_load(
+                'users', users_payload, lambda row: f"user {row['username']}",
+                chunk_size=MIGRATION_BATCH_SIZE
+            )
+            
+            # Store mapping for foreign key relationships
+            for row in inserted:
+                self.user_id_mapping[sql_user_ids[row['id']]] = row['id']
+            self._checkpoint_mapping('user_id_mapping')
+            self.migration_stats['users_migrated'] += len(inserted)
+            print(f"  ✅ Migrated {len(inserted)} users")
+            
+            # Users that failed are retried on the next run, so only then is the phase done
+            if len(inserted) == len(users_payload):
+                self._complete_phase('users')
+                    
         except Exception as e:
             error_msg = f"Error in user migration: {e}"
             self.migration_stats['errors'].append(error_msg)
@@ -127,170 +424,243 @@ class DataMigrator:
     def migrate_price_books(self, default_org: Organization):
         """Migrate price books from SQLAlchemy to Supabase"""
         print("\n🔄 Migrating price books...")
+        if 'price_books' in self.completed_phases:
+            print("  ⏭️  Already migrated by a previous run")
+            return
         
         try:
-            with app.app_context():
-                sql_price_books = SQLPriceBook.query.all()
-                print(f"Found {len(sql_price_books)} price books to migrate")
-                
-                for sql_pb in sql_price_books:
-                    try:
-                        new_pb_id = uuid4()
-                        
-                        # Map user ID
-                        user_uuid = self.user_id_mapping.get(sql_pb.user_id)
-                        
-                        price_book_data = {
-                            'id': str(new_pb_id),
-                            'organization_id': str(default_org.id),
-                            'name': sql_pb.name,
-                            'user_id': str(user_uuid) if user_uuid else None
-                        }
-                        
-                        response = self.client.table('price_books').insert(price_book_data).execute()
-                        
-                        if response.data:
-                            self.price_book_id_mapping[sql_pb.id] = new_pb_id
-                            self.migration_stats['price_books_migrated'] += 1
-                            print(f"  ✅ Migrated price book: {sql_pb.name}")
-                            
-                            # Migrate associated price items
-                            self.migrate_price_items(sql_pb, new_pb_id)
-                        else:
-                            raise Exception("No data returned from insert")
-                            
-                    except Exception as e:
-                        error_msg = f"Error migrating price book {sql_pb.name}: {e}"
-                        self.migration_stats['errors'].append(error_msg)
-                        print(f"  ❌ {error_msg}")
-                        
+            sql_price_books = [pb for pb in SQLPriceBook.query.all() if pb.id not in self.price_book_id_mapping]
+            print(f"Found {len(sql_price_books)} price books to migrate")
+            org_id = str(default_org.id)
+            
+            # Books whose owner was not migrated wait for a later run, once their user is in
+            unmapped = [pb for pb in sql_price_books if pb.user_id not in self.user_id_mapping]
+            if unmapped:
+                sql_price_books = [pb for pb in sql_price_books if pb.user_id in self.user_id_mapping]
+                error_msg = f"Skipped {len(unmapped)} price books whose user was not migrated"
+                self.migration_stats['errors'].append(error_msg)
+                print(f"  ⚠️  {error_msg}")
+            
+            # Build every price book row up front with pre-generated UUIDs
+            sql_price_book_ids = {}  # Supabase row ID -> SQLAlchemy ID
+            books_payload = []
+            for sql_pb in sql_price_books:
+                price_book_data = self._price_book_row(sql_pb, org_id)
+                books_payload.append(price_book_data)
+                sql_price_book_ids[price_book_data['id']] = sql_pb.id
+            
+            inserted = self._bulk_load(
+                'price_books', books_payload, lambda row: f"price book {row['name']}",
+                chunk_size=MIGRATION_BATCH_SIZE
+            )
+            for row in inserted:
+                self.price_book_id_mapping[sql_price_book_ids[row['id']]] = row['id']
+            self._checkpoint_mapping('price_book_id_mapping')
+            self.migration_stats['price_books_migrated'] += len(inserted)
+            print(f"  ✅ Migrated {len(inserted)} price books")
+            
+            if not unmapped and len(inserted) == len(books_payload):
+                self._complete_phase('price_books')
+            
         except Exception as e:
             error_msg = f"Error in price book migration: {e}"
             self.migration_stats['errors'].append(error_msg)
             print(f"❌ {error_msg}")
     
-    def migrate_price_items(self, sql_price_book, new_pb_id):
-        """Migrate price items for a specific price book"""
+    def migrate_price_items(self):
+        """
+        Migrate price items for all migrated price books
+        
+        Runs on a worker thread next to migrate_processed_pos, so it pushes its
+        own app context (and gets its own scoped session)
+        """
+        if 'price_items' in self.completed_phases:
+            print("    ⏭️  Price items already migrated by a previous run")
+            return
+        
         try:
-            sql_items = SQLPriceItem.query.filter_by(price_book_id=sql_price_book.id).all()
-            
-            if not sql_items:
-                return
-            
-            items_data = []
-            for sql_item in sql_items:
-                item_data = {
-                    'id': str(uuid4()),
-                    'price_book_id': str(new_pb_id),
-                    'model_number': sql_item.model_number,
-                    'price': float(sql_item.price),
-                    'source_column': sql_item.source_column,
-                    'excel_row': sql_item.excel_row
-                }
-                items_data.append(item_data)
-            
-            # Bulk insert items
-            response = self.client.table('price_items').insert(items_data).execute()
-            
-            if response.data:
-                self.migration_stats['price_items_migrated'] += len(response.data)
-                print(f"    ✅ Migrated {len(response.data)} price items")
-            
+            with app.app_context():
+                book_ids = [book_id for book_id in self.price_book_id_mapping if book_id not in self.price_item_book_ids]
+                if not book_ids:
+                    return
+                
+                # One streamed query for the items of every migrated price book, grouped
+                # by book so each batch can be checkpointed as a set of complete books
+                sql_items = SQLPriceItem.query.filter(SQLPriceItem.price_book_id.in_(book_ids)) \
+                    .order_by(SQLPriceItem.price_book_id) \
+                    .execution_options(stream_results=True).yield_per(STREAM_BATCH_SIZE)
+                
+                # Bulk load items a batch at a time so memory stays flat on large catalogs;
+                # batches only end on a price book boundary
+                inserted_count = 0
+                items_data = []
+                batch_book_ids = []
+                for sql_item in sql_items:
+                    if not batch_book_ids or sql_item.price_book_id != batch_book_ids[-1]:
+                        if len(items_data) >= STREAM_BATCH_SIZE:
+                            inserted_count += self._load_price_items(items_data, batch_book_ids)
+                            items_data, batch_book_ids = [], []
+                        batch_book_ids.append(sql_item.price_book_id)
+                    items_data.append(self._price_item_row(sql_item))
+                if items_data:
+                    inserted_count += self._load_price_items(items_data, batch_book_ids)
+                
+                self.migration_stats['price_items_migrated'] += inserted_count
+                print(f"    ✅ Migrated {inserted_count} price items")
+                # Books held back (failed inserts, unmigrated users) still need their items on a
+                # later run; until then price_item_book_ids alone tracks what has been loaded
+                if 'price_books' in self.completed_phases:
+                    self._complete_phase('price_items')
+                
         except Exception as e:
-            error_msg = f"Error migrating price items for {sql_price_book.name}: {e}"
+            error_msg = f"Error migrating price items: {e}"
             self.migration_stats['errors'].append(error_msg)
             print(f"    ❌ {error_msg}")
     
+    def _load_price_items(self, items_data: list, book_ids: list) -> int:
+        """Load one batch of price items and checkpoint the price books it completes"""
+        inserted = self._bulk_load(
+            'price_items', items_data, lambda row: f"price item {row['model_number']}"
+        )
+        # Rows that failed individually are reported, not retried, so a retry never duplicates a book
+        with self._checkpoint_lock:
+            self.price_item_book_ids.update(book_ids)
+            _save_checkpoint('price_item_book_ids', sorted(self.price_item_book_ids))
+        return len(inserted)
+    
     def migrate_processed_pos(self, default_org: Organization):
         """Migrate processed POs from SQLAlchemy to Supabase"""
         print("\n🔄 Migrating processed POs...")
+        if 'processed_pos' in self.completed_phases:
+            print("  ⏭️  Already migrated by a previous run")
+            return
         
         try:
-            with app.app_context():
-                sql_pos = SQLProcessedPO.query.all()
-                print(f"Found {len(sql_pos)} processed POs to migrate")
+            print(f"Found {SQLProcessedPO.query.count()} processed POs to migrate")
+            
+            # Stream POs, loading each batch's line items with one extra query instead of one per PO
+            sql_pos = SQLProcessedPO.query.options(selectinload(SQLProcessedPO.line_items)) \
+                .execution_options(stream_results=True).yield_per(STREAM_BATCH_SIZE)
+            org_id = str(default_org.id)
+            
+            # POs are loaded a batch at a time, each followed by its line items
+            po_rows = []
+            sql_po_ids = {}  # Supabase row ID -> SQLAlchemy ID
+            pending_line_items = {}  # Supabase PO ID -> line item rows
+            skipped = 0
+            all_inserted = True
+            for sql_po in sql_pos:
+                if sql_po.id in self.processed_po_id_mapping:
+                    continue
+                if sql_po.price_book_id not in self.price_book_id_mapping or sql_po.user_id not in self.user_id_mapping:
+                    skipped += 1
+                    continue
                 
-                for sql_po in sql_pos:
-                    try:
-                        new_po_id = uuid4()
-                        
-                        # Map foreign keys
-                        user_uuid = self.user_id_mapping.get(sql_po.user_id)
-                        pb_uuid = self.price_book_id_mapping.get(sql_po.price_book_id)
-                        
-                        if not pb_uuid:
-                            print(f"  ⚠️  Skipping PO {sql_po.filename} - price book not found")
-                            continue
-                        
-                        po_data = {
-                            'id': str(new_po_id),
-                            'organization_id': str(default_org.id),
-                            'filename': sql_po.filename,
-                            'price_book_id': str(pb_uuid),
-                            'user_id': str(user_uuid) if user_uuid else None,
-                            'processed_at': sql_po.processed_at.isoformat() if sql_po.processed_at else None
-                        }
-                        
-                        response = self.client.table('processed_pos').insert(po_data).execute()
-                        
-                        if response.data:
-                            self.processed_po_id_mapping[sql_po.id] = new_po_id
-                            self.migration_stats['processed_pos_migrated'] += 1
-                            print(f"  ✅ Migrated PO: {sql_po.filename}")
-                            
-                            # Migrate line items
-                            self.migrate_po_line_items(sql_po, new_po_id)
-                        else:
-                            raise Exception("No data returned from insert")
-                            
-                    except Exception as e:
-                        error_msg = f"Error migrating PO {sql_po.filename}: {e}"
-                        self.migration_stats['errors'].append(error_msg)
-                        print(f"  ❌ {error_msg}")
-                        
+                po_data = self._processed_po_row(sql_po, org_id)
+                po_rows.append(po_data)
+                sql_po_ids[po_data['id']] = sql_po.id
+                pending_line_items[po_data['id']] = [
+                    self._po_line_item_row(sql_item, po_data['id']) for sql_item in sql_po.line_items
+                ]
+                
+                if len(po_rows) >= MIGRATION_BATCH_SIZE:
+                    all_inserted &= self._load_processed_pos(po_rows, sql_po_ids, pending_line_items)
+                    po_rows, sql_po_ids, pending_line_items = [], {}, {}
+            
+            if po_rows:
+                all_inserted &= self._load_processed_pos(po_rows, sql_po_ids, pending_line_items)
+            
+            if skipped:
+                print(f"  ⚠️  Skipped {skipped} POs - price book or user not found")
+            print(f"  ✅ Migrated {self.migration_stats['processed_pos_migrated']} POs")
+            # POs that failed or were skipped are retried on the next run, so only then is the phase done
+            if all_inserted and not skipped:
+                self._complete_phase('processed_pos')
+                    
         except Exception as e:
             error_msg = f"Error in processed PO migration: {e}"
             self.migration_stats['errors'].append(error_msg)
             print(f"❌ {error_msg}")
     
-    def migrate_po_line_items(self, sql_po, new_po_id):
-        """Migrate line items for a specific processed PO"""
+    def _load_processed_pos(self, po_rows: list, sql_po_ids: dict, pending_line_items: dict) -> bool:
+        """
+        Load one batch of processed POs, then the line items of the POs that were inserted
+        
+        Returns whether every PO in the batch was inserted
+        """
+        inserted = self._bulk_load(
+            'processed_pos', po_rows, lambda row: f"PO {row['filename']}",
+            chunk_size=MIGRATION_BATCH_SIZE
+        )
+        
+        line_items_data = []
+        for row in inserted:
+            self.processed_po_id_mapping[sql_po_ids[row['id']]] = row['id']
+            line_items_data.extend(pending_line_items[row['id']])
+        self.migration_stats['processed_pos_migrated'] += len(inserted)
+        
+        self.migrate_po_line_items(line_items_data)
+        # Checkpointed after the line items, so an interrupted batch is redone rather than left without them
+        self._checkpoint_mapping('processed_po_id_mapping')
+        return len(inserted) == len(po_rows)
+    
+    def migrate_po_line_items(self, line_items_data: list):
+        """Migrate line items for all migrated processed POs"""
         try:
-            sql_line_items = SQLPOLineItem.query.filter_by(processed_po_id=sql_po.id).all()
-            
-            if not sql_line_items:
+            if not line_items_data:
                 return
             
-            line_items_data = []
-            for sql_item in sql_line_items:
-                item_data = {
-                    'id': str(uuid4()),
-                    'processed_po_id': str(new_po_id),
-                    'model_number': sql_item.model_number,
-                    'po_price': float(sql_item.po_price),
-                    'book_price': float(sql_item.book_price) if sql_item.book_price else None,
-                    'status': sql_item.status,
-                    'discrepancy': float(sql_item.discrepancy) if sql_item.discrepancy else None
-                }
-                line_items_data.append(item_data)
-            
-            # Bulk insert line items
-            response = self.client.table('po_line_items').insert(line_items_data).execute()
+            # Bulk load line items
+            inserted = self._bulk_load(
+                'po_line_items', line_items_data, lambda row: f"line item {row['model_number']}"
+            )
             
-            if response.data:
-                self.migration_stats['po_line_items_migrated'] += len(response.data)
-                print(f"    ✅ Migrated {len(response.data)} line items")
+            self.migration_stats['po_line_items_migrated'] += len(inserted)
+            print(f"    ✅ Migrated {len(inserted)} line items")
             
         except Exception as e:
-            error_msg = f"Error migrating line items for {sql_po.filename}: {e}"
+            error_msg = f"Error migrating line items: {e}"
             self.migration_stats['errors'].append(error_msg)
             print(f"    ❌ {error_msg}")
     
+    def prepare_bulk_load(self) -> bool:
+        """Drop secondary indexes and disable user triggers on the bulk-loaded tables"""
+        try:
+            self.client.rpc('pre_migration_prep').execute()
+            print("  ✅ Dropped secondary indexes and disabled triggers for bulk load")
+            return True
+        except Exception as e:
+            # Loading still works with indexes and triggers in place, just slower
+            print(f"  ⚠️  Could not prepare tables for bulk load ({e}), continuing with indexes in place")
+            return False
+    
+    def finalize_bulk_load(self):
+        """Rebuild the indexes and re-enable the triggers removed by prepare_bulk_load"""
+        try:
+            self.client.rpc('post_migration_finalize').execute()
+            print("  ✅ Rebuilt indexes and re-enabled triggers")
+        except httpx.TransportError as e:
+            # No response doesn't mean it failed; the function is safe to run again either way
+            error_msg = (f"post_migration_finalize() did not respond ({e!r}) and may have completed - "
+                         "run it again to be sure the indexes and triggers are restored")
+            self.migration_stats['errors'].append(error_msg)
+            print(f"⚠️  {error_msg}")
+        except Exception as e:
+            error_msg = f"Error restoring indexes and triggers - run post_migration_finalize() manually: {e}"
+            self.migration_stats['errors'].append(error_msg)
+            print(f"❌ {error_msg}")
+    
     def run_migration(self):
         """Run the complete migration process"""
         print("🚀 Starting data migration from SQLAlchemy to Supabase...")
         print(f"Migration started at: {datetime.now()}")
         
+        # One app context (and session) for every phase run on this thread
+        with app.app_context():
+            return self._run_migration()
+    
+    def _run_migration(self):
+        """Run the migration steps; expects an app context"""
         try:
             # Step 1: Create default organization
             default_org = self.create_default_organization()
@@ -298,14 +668,31 @@ class DataMigrator:
                 print("❌ Migration failed - could not create default organization")
                 return False
             
-            # Step 2: Migrate users
-            self.migrate_users(default_org)
-            
-            # Step 3: Migrate price books and items
-            self.migrate_price_books(default_org)
-            
-            # Step 4: Migrate processed POs and line items
-            self.migrate_processed_pos(default_org)
+            # Drop secondary indexes and triggers for the bulk load; always restore them after
+            prepared = self.prepare_bulk_load()
+            try:
+                # Steps 2-4 in one server-side transaction, or table by table if that fails.
+                # A resumed run goes table by table so checkpointed rows are skipped.
+                if self.resuming:
+                    print(f"\n⏭️  Resuming from checkpoints in {CHECKPOINT_DIR}")
+                if self.resuming or not self.migrate_bundle(default_org):
+                    # Step 2: Migrate users
+                    self.migrate_users(default_org)
+                    
+                    # Step 3: Migrate price books
+                    self.migrate_price_books(default_org)
+                    
+                    # Step 4: Price items and processed POs (with line items) only depend on
+                    # price books, so load price items on a worker thread while this thread
+                    # loads the POs. They update separate stats counters; error list appends
+                    # are atomic.
+                    with ThreadPoolExecutor(max_workers=1) as executor:
+                        price_items_load = executor.submit(self.migrate_price_items)
+                        self.migrate_processed_pos(default_org)
+                        price_items_load.result()
+            finally:
+                if prepared:
+                    self.finalize_bulk_load()
             
             # Print migration summary
             self.print_migration_summary()
@@ -0,0 +1,72 @@
+-- OrderGuard AI Pro - Bundled Data Migration RPC
+-- Inserts all legacy rows built by migrate_to_supabase.py in a single transaction
+-- Called through the service role only
+
+CREATE OR REPLACE FUNCTION migrate_bundle(payload JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    users_count INTEGER;
+    price_books_count INTEGER;
+    price_items_count INTEGER;
+    processed_pos_count INTEGER;
+    po_line_items_count INTEGER;
+BEGIN
+    -- Parents are inserted before children so foreign keys resolve;
+    -- any error aborts the whole function and rolls everything back
+    INSERT INTO users (id, organization_id, email, username, role, is_admin, is_active)
+    SELECT id, organization_id, email, username, role, is_admin, is_active
+    FROM jsonb_to_recordset(COALESCE(payload->'users', '[]'::jsonb)) AS t(
+        id UUID, organization_id UUID, email VARCHAR, username VARCHAR,
+        role VARCHAR, is_admin BOOLEAN, is_active BOOLEAN
+    );
+    GET DIAGNOSTICS users_count = ROW_COUNT;
+    
+    INSERT INTO price_books (id, organization_id, name, user_id)
+    SELECT id, organization_id, name, user_id
+    FROM jsonb_to_recordset(COALESCE(payload->'price_books', '[]'::jsonb)) AS t(
+        id UUID, organization_id UUID, name VARCHAR, user_id UUID
+    );
+    GET DIAGNOSTICS price_books_count = ROW_COUNT;
+    
+    INSERT INTO price_items (id, price_book_id, model_number, price, source_column, excel_row)
+    SELECT id, price_book_id, model_number, price, source_column, excel_row
+    FROM jsonb_to_recordset(COALESCE(payload->'price_items', '[]'::jsonb)) AS t(
+        id UUID, price_book_id UUID, model_number VARCHAR, price DECIMAL(10, 2),
+        source_column VARCHAR, excel_row INTEGER
+    );
+    GET DIAGNOSTICS price_items_count = ROW_COUNT;
+    
+    INSERT INTO processed_pos (id, organization_id, filename, price_book_id, user_id, processed_at)
+    SELECT id, organization_id, filename, price_book_id, user_id, COALESCE(processed_at, NOW())
+    FROM jsonb_to_recordset(COALESCE(payload->'processed_pos', '[]'::jsonb)) AS t(
+        id UUID, organization_id UUID, filename VARCHAR, price_book_id UUID,
+        user_id UUID, processed_at TIMESTAMP WITH TIME ZONE
+    );
+    GET DIAGNOSTICS processed_pos_count = ROW_COUNT;
+    
+    INSERT INTO po_line_items (id, processed_po_id, model_number, po_price, book_price, status, discrepancy)
+    SELECT id, processed_po_id, model_number, po_price, book_price, status, discrepancy
+    FROM jsonb_to_recordset(COALESCE(payload->'po_line_items', '[]'::jsonb)) AS t(
+        id UUID, processed_po_id UUID, model_number VARCHAR, po_price DECIMAL(10, 2),
+        book_price DECIMAL(10, 2), status VARCHAR, discrepancy DECIMAL(10, 2)
+    );
+    GET DIAGNOSTICS po_line_items_count = ROW_COUNT;
+    
+    RETURN jsonb_build_object(
+        'users', users_count,
+        'price_books', price_books_count,
+        'price_items', price_items_count,
+        'processed_pos', processed_pos_count,
+        'po_line_items', po_line_items_count
+    );
+END;
+$$;
+
+-- Migration only: keep it away from client roles
+REVOKE ALL ON FUNCTION migrate_bundle(JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION migrate_bundle(JSONB) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION migrate_bundle(JSONB) TO service_role;
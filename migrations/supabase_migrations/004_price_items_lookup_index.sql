@@ -0,0 +1,14 @@
+-- OrderGuard AI Pro - Price Item Lookup Index
+-- Replaces the two single-purpose price_items indexes with one covering index
+-- for the matcher's price_book_id + model_number lookups
+
+-- price_items has no organization_id column (tenancy comes through price_books),
+-- so the index leads with price_book_id. INCLUDE lets lookups return the price
+-- and its source location from the index alone.
+CREATE INDEX IF NOT EXISTS idx_price_items_lookup
+    ON price_items (price_book_id, model_number)
+    INCLUDE (price, source_column, excel_row);
+
+-- Both are served by idx_price_items_lookup now
+DROP INDEX IF EXISTS idx_price_items_model_book;
+DROP INDEX IF EXISTS idx_price_items_price_book;
@@ -0,0 +1,61 @@
+-- OrderGuard AI Pro - Bulk Load Helpers
+-- Used by migrate_to_supabase.py around the one-off legacy data load
+-- Called through the service role only
+
+-- Drop secondary indexes and disable user triggers on the bulk-loaded tables.
+-- Primary keys, unique constraints and foreign keys stay in place.
+CREATE OR REPLACE FUNCTION pre_migration_prep()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DROP INDEX IF EXISTS idx_price_items_lookup;
+    DROP INDEX IF EXISTS idx_processed_pos_organization;
+    DROP INDEX IF EXISTS idx_processed_pos_user;
+    DROP INDEX IF EXISTS idx_processed_pos_date;
+    DROP INDEX IF EXISTS idx_po_line_items_processed_po;
+    DROP INDEX IF EXISTS idx_po_line_items_status;
+    
+    -- Also keeps historical POs from counting against (or being blocked by)
+    -- the organization's monthly PO limit
+    ALTER TABLE price_items DISABLE TRIGGER USER;
+    ALTER TABLE processed_pos DISABLE TRIGGER USER;
+    ALTER TABLE po_line_items DISABLE TRIGGER USER;
+END;
+$$;
+
+-- Rebuild what pre_migration_prep removed and refresh planner statistics.
+-- Safe to call more than once.
+CREATE OR REPLACE FUNCTION post_migration_finalize()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    CREATE INDEX IF NOT EXISTS idx_price_items_lookup
+        ON price_items (price_book_id, model_number)
+        INCLUDE (price, source_column, excel_row);
+    CREATE INDEX IF NOT EXISTS idx_processed_pos_organization ON processed_pos(organization_id);
+    CREATE INDEX IF NOT EXISTS idx_processed_pos_user ON processed_pos(user_id);
+    CREATE INDEX IF NOT EXISTS idx_processed_pos_date ON processed_pos(processed_at);
+    CREATE INDEX IF NOT EXISTS idx_po_line_items_processed_po ON po_line_items(processed_po_id);
+    CREATE INDEX IF NOT EXISTS idx_po_line_items_status ON po_line_items(status);
+    
+    ALTER TABLE price_items ENABLE TRIGGER USER;
+    ALTER TABLE processed_pos ENABLE TRIGGER USER;
+    ALTER TABLE po_line_items ENABLE TRIGGER USER;
+    
+    ANALYZE price_items;
+    ANALYZE processed_pos;
+    ANALYZE po_line_items;
+END;
+$$;
+
+-- Migration only: keep them away from client roles
+REVOKE ALL ON FUNCTION pre_migration_prep() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION post_migration_finalize() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION pre_migration_prep() TO service_role;
+GRANT EXECUTE ON FUNCTION post_migration_finalize() TO service_role;
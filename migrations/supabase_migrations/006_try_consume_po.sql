@@ -0,0 +1,52 @@
+-- OrderGuard AI Pro - Atomic PO Quota
+-- Checks and consumes one PO from an organization's monthly limit in a single
+-- statement, so concurrent uploads cannot overshoot monthly_po_limit
+--
+-- Nothing inserts processed_pos through Supabase yet, so the check_po_limit and
+-- increment_organization_po_count triggers from 002_rls_policies.sql stay in place
+-- and keep enforcing the quota. The change that makes the PO insert path call
+-- try_consume_po must, in the same migration, drop both triggers (or they count
+-- every PO twice) and relax the validate_organization_po_limit check in the
+-- processed_pos INSERT policy (or it rejects the last PO try_consume_po allowed).
+
+CREATE OR REPLACE FUNCTION try_consume_po(org_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    consumed organizations;
+BEGIN
+    -- Members may only consume their own organization's quota
+    IF auth.role() <> 'service_role' AND org_id IS DISTINCT FROM auth.user_organization_id() THEN
+        RAISE EXCEPTION 'Not a member of organization %', org_id;
+    END IF;
+    
+    -- The row lock taken by UPDATE serializes concurrent callers, so the limit
+    -- is checked against the latest count. An elapsed reset_date starts a new month.
+    UPDATE organizations
+    SET monthly_po_count = CASE WHEN reset_date <= CURRENT_DATE THEN 1 ELSE monthly_po_count + 1 END,
+        reset_date = CASE WHEN reset_date <= CURRENT_DATE THEN CURRENT_DATE + INTERVAL '1 month' ELSE reset_date END
+    WHERE id = org_id
+      AND is_active
+      AND (subscription_plan = 'enterprise'
+           OR reset_date <= CURRENT_DATE
+           OR monthly_po_count < monthly_po_limit)
+    RETURNING * INTO consumed;
+    
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('ok', false, 'remaining', 0);
+    END IF;
+    
+    RETURN jsonb_build_object(
+        'ok', true,
+        'remaining', CASE WHEN consumed.subscription_plan = 'enterprise' THEN NULL
+                          ELSE consumed.monthly_po_limit - consumed.monthly_po_count END,
+        'used', consumed.monthly_po_count,
+        'limit', consumed.monthly_po_limit
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION try_consume_po(UUID) TO authenticated, service_role;
@@ -0,0 +1,35 @@
+-- OrderGuard AI Pro - Price Book Creation RPC
+-- Inserts a price book and all of its items in one transaction and returns both,
+-- so PriceBookRepository.create_with_items needs a single round trip
+
+-- SECURITY INVOKER (the default): the caller's RLS insert policies still apply
+CREATE OR REPLACE FUNCTION create_price_book_with_items(book JSONB, items JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    new_book price_books;
+    new_items JSONB;
+BEGIN
+    -- Explicit NULLs would override column defaults, so fill missing IDs here
+    INSERT INTO price_books (id, organization_id, name, user_id)
+    SELECT COALESCE(b.id, uuid_generate_v4()), b.organization_id, b.name, b.user_id
+    FROM jsonb_to_record(book) AS b(id UUID, organization_id UUID, name VARCHAR, user_id UUID)
+    RETURNING * INTO new_book;
+    
+    WITH inserted AS (
+        INSERT INTO price_items (id, price_book_id, model_number, price, source_column, excel_row)
+        SELECT COALESCE(i.id, uuid_generate_v4()), new_book.id, i.model_number, i.price, i.source_column, i.excel_row
+        FROM jsonb_to_recordset(COALESCE(items, '[]'::jsonb)) AS i(
+            id UUID, model_number VARCHAR, price NUMERIC, source_column VARCHAR, excel_row INTEGER
+        )
+        RETURNING *
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) INTO new_items FROM inserted;
+    
+    RETURN jsonb_build_object('book', to_jsonb(new_book), 'items', new_items);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION create_price_book_with_items(JSONB, JSONB) TO authenticated, service_role;
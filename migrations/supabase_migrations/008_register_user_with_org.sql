@@ -0,0 +1,61 @@
+-- OrderGuard AI Pro - Registration RPC
+-- Creates a new organization (with a unique slug) and its owner's profile in one
+-- transaction, so a failed profile insert never leaves an orphaned organization
+-- Called through the service role only, right after the Supabase Auth sign-up
+
+CREATE OR REPLACE FUNCTION register_user_with_org(
+    p_user_id UUID,
+    p_email TEXT,
+    p_username TEXT,
+    p_org_name TEXT
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    -- Collapse every run of non-alphanumerics into one dash, e.g. 'Foo   Bar!' -> 'foo-bar'
+    base_slug TEXT := COALESCE(
+        NULLIF(trim(BOTH '-' FROM regexp_replace(lower(p_org_name), '[^a-z0-9]+', '-', 'g')), ''),
+        'organization'
+    );
+    candidate TEXT;
+    next_suffix INTEGER;
+    new_org organizations;
+    new_user users;
+BEGIN
+    LOOP
+        -- Use the plain slug if it is free, otherwise one past the highest "<slug>-N"
+        IF NOT EXISTS (SELECT 1 FROM organizations WHERE slug = base_slug) THEN
+            candidate := base_slug;
+        ELSE
+            SELECT COALESCE(MAX(substring(slug FROM length(base_slug) + 2)::INTEGER), 0) + 1
+            INTO next_suffix
+            FROM organizations
+            WHERE left(slug, length(base_slug) + 1) = base_slug || '-'
+              AND substring(slug FROM length(base_slug) + 2) ~ '^[0-9]+$';
+            candidate := base_slug || '-' || next_suffix;
+        END IF;
+        
+        BEGIN
+            INSERT INTO organizations (name, slug, subscription_status, subscription_plan)
+            VALUES (p_org_name, candidate, 'trial', 'starter')
+            RETURNING * INTO new_org;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- A concurrent registration took this slug first; pick again
+        END;
+    END LOOP;
+    
+    -- First user of an organization is its owner
+    INSERT INTO users (id, organization_id, email, username, role, is_active)
+    VALUES (p_user_id, new_org.id, p_email, p_username, 'owner', true)
+    RETURNING * INTO new_user;
+    
+    RETURN jsonb_build_object('organization', to_jsonb(new_org), 'user', to_jsonb(new_user));
+END;
+$$;
+
+REVOKE ALL ON FUNCTION register_user_with_org(UUID, TEXT, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION register_user_with_org(UUID, TEXT, TEXT, TEXT) TO service_role;
@@ -0,0 +1,13 @@
+-- OrderGuard AI Pro - User Search Trigram Indexes
+-- Lets UserRepository.search_users' substring ILIKE filters use an index
+-- instead of scanning every user on each keystroke of the user picker
+
+-- Trigram GIN indexes serve leading-wildcard ILIKE ('%term%'), which B-tree
+-- indexes cannot. Postgres ORs the two with a BitmapOr, so search semantics
+-- (case-insensitive substring match) are unchanged.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+    ON users USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm
+    ON users USING GIN (email gin_trgm_ops);
@@ -0,0 +1,34 @@
+-- OrderGuard AI Pro - Organization/Role JWT Claims
+-- Mirrors users.organization_id and users.role into auth.users.raw_app_meta_data,
+-- which Supabase Auth copies into the app_metadata claim of every access token it
+-- issues. organization_required reads them from the token instead of querying users.
+-- app_metadata is only writable server-side, so clients cannot forge these claims.
+
+CREATE OR REPLACE FUNCTION sync_user_app_metadata()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    UPDATE auth.users
+    SET raw_app_meta_data = COALESCE(raw_app_meta_data, '{}'::jsonb)
+        || jsonb_build_object('organization_id', NEW.organization_id, 'role', NEW.role)
+    WHERE id = NEW.id;
+    RETURN NEW;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION sync_user_app_metadata() FROM PUBLIC, anon, authenticated;
+
+-- Fires for register_user_with_org, update_role and bulk organization moves alike
+CREATE TRIGGER sync_user_app_metadata
+    AFTER INSERT OR UPDATE OF organization_id, role ON users
+    FOR EACH ROW EXECUTE FUNCTION sync_user_app_metadata();
+
+-- Backfill existing users; their tokens pick the claims up on next refresh
+UPDATE auth.users a
+SET raw_app_meta_data = COALESCE(a.raw_app_meta_data, '{}'::jsonb)
+    || jsonb_build_object('organization_id', u.organization_id, 'role', u.role)
+FROM users u
+WHERE u.id = a.id;
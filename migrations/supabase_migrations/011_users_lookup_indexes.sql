@@ -0,0 +1,18 @@
+-- OrderGuard AI Pro - User Lookup Indexes
+-- Matches the predicates UserRepository actually sends:
+--   organization_id = ? AND role IN (...)    get_organization_admins/owner/leadership
+--   organization_id = ? AND is_active = true  get_active_users_count
+
+CREATE INDEX IF NOT EXISTS idx_users_organization_role
+    ON users (organization_id, role);
+
+-- Partial index lets the active-user count run as an index-only scan
+CREATE INDEX IF NOT EXISTS idx_users_organization_active
+    ON users (organization_id) WHERE is_active;
+
+-- Served by idx_users_organization_role (organization_id is its leading column)
+DROP INDEX IF EXISTS idx_users_organization;
+
+-- email and username lookups are already served by the UNIQUE constraints from
+-- 001_initial_schema.sql. Repository lookups are exact-match eq filters, so
+-- lower() expression indexes would go unused.
@@ -0,0 +1,44 @@
+"""
+One-off schema update for price columns
+Converts the double precision price columns to exact NUMERIC(12, 4)
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db
+from models import PriceItem, POLineItem
+
+PRICE_COLUMNS = [
+    (PriceItem, 'price'),
+    (POLineItem, 'po_price'),
+    (POLineItem, 'book_price'),
+    (POLineItem, 'discrepancy'),
+]
+
+def use_numeric_prices():
+    """Convert each price column to NUMERIC(12, 4), rounding away float noise"""
+    with app.app_context():
+        for model, column in PRICE_COLUMNS:
+            table = model.__table__.name
+            db.session.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE NUMERIC(12, 4) "
+                f"USING round({column}::numeric, 4)"
+            ))
+            print(f"  ✅ {table}.{column} is now NUMERIC(12, 4)")
+        db.session.commit()
+
+def main():
+    """Main schema update function"""
+    print("🔄 Converting price columns to exact decimals...")
+    use_numeric_prices()
+    print("\n🎉 Schema update complete")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
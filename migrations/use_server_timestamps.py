@@ -0,0 +1,47 @@
+"""
+One-off schema update for the model timestamps
+Created/updated/processed times are now set by Postgres; switch existing
+columns to TIMESTAMPTZ (the stored naive values are UTC) with a now() default
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db
+from models import User, PriceBook, ProcessedPO
+
+TIMESTAMP_COLUMNS = [
+    (User, 'created_at'),
+    (PriceBook, 'created_at'),
+    (PriceBook, 'updated_at'),
+    (ProcessedPO, 'processed_at'),
+]
+
+def use_server_timestamps():
+    """Convert each timestamp column to TIMESTAMPTZ and give it a DEFAULT now()"""
+    with app.app_context():
+        for model, column in TIMESTAMP_COLUMNS:
+            # "user" is a reserved word in Postgres, so quote every table name
+            table = f'"{model.__table__.name}"'
+            db.session.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE "
+                f"USING {column} AT TIME ZONE 'UTC'"
+            ))
+            db.session.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT now()"))
+            print(f"  ✅ {model.__table__.name}.{column} now defaults to now()")
+        db.session.commit()
+
+def main():
+    """Main schema update function"""
+    print("🔄 Moving timestamp defaults to the database...")
+    use_server_timestamps()
+    print("\n🎉 Schema update complete")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
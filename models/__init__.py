@@ -1,5 +1,9 @@
+"""
+SQLAlchemy models for the legacy database
+The Supabase dataclasses live in models.supabase_models
+"""
+
 from app import db
-import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -10,7 +14,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     
     # Define relationships
     price_books = db.relationship('PriceBook', backref='owner', lazy='dynamic')
@@ -29,9 +33,10 @@ class PriceBook(db.Model):
     """Model for price books"""
     id = db.Column(db.String(36), primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now())
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content_sha256 = db.Column(db.String(64), index=True)  # Hash of the uploaded file, used to skip re-imports
     
     # Define relationship with PriceItem
     items = db.relationship('PriceItem', backref='price_book', cascade='all, delete-orphan')
@@ -50,14 +55,14 @@ class PriceItem(db.Model):
     """Model for individual price items in a price book"""
     id = db.Column(db.Integer, primary_key=True)
     model_number = db.Column(db.String(100), nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Numeric(12, 4), nullable=False)  # Exact decimal, not IEEE-754 float
     price_book_id = db.Column(db.String(36), db.ForeignKey('price_book.id'), nullable=False)
     source_column = db.Column(db.String(100), nullable=True)  # Track which column the price came from
     excel_row = db.Column(db.Integer, nullable=True)  # Track Excel row number
     
-    # Create an index on model_number and price_book_id for faster lookups
+    # Index led by price_book_id so loading one price book (and point lookups within it) is a seek
     __table_args__ = (
-        db.Index('idx_model_pricebook', 'model_number', 'price_book_id'),
+        db.Index('ix_priceitem_book_model', 'price_book_id', 'model_number'),
     )
     
     def __repr__(self):
@@ -68,8 +73,9 @@ class ProcessedPO(db.Model):
     """Model to store processed purchase orders"""
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
+    po_number = db.Column(db.String(255), index=True)  # Extracted from filename at insert time
     price_book_id = db.Column(db.String(36), db.ForeignKey('price_book.id'), nullable=False)
-    processed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    processed_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     # Define relationship with PriceBook
@@ -87,10 +93,10 @@ class POLineItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     processed_po_id = db.Column(db.Integer, db.ForeignKey('processed_po.id'), nullable=False)
     model_number = db.Column(db.String(100), nullable=False)
-    po_price = db.Column(db.Float, nullable=False)
-    book_price = db.Column(db.Float, nullable=True)  # Null if model not found in price book
+    po_price = db.Column(db.Numeric(12, 4), nullable=False)
+    book_price = db.Column(db.Numeric(12, 4), nullable=True)  # Null if model not found in price book
     status = db.Column(db.String(50), nullable=False)  # "Match", "Mismatch", "Model Not Found", "Data Extraction Issue"
-    discrepancy = db.Column(db.Float, nullable=True)  # Price difference (if mismatch)
+    discrepancy = db.Column(db.Numeric(12, 4), nullable=True)  # Price difference (if mismatch)
     
     def __repr__(self):
         return f'<POLineItem {self.model_number} ${self.po_price} - {self.status}>'
\ No newline at end of file
@@ -9,7 +9,24 @@ from typing import Optional, List
 from uuid import UUID, uuid4
 from decimal import Decimal
 
-@dataclass
+# Bound once so each parsed timestamp skips the datetime attribute lookup
+_fromisoformat = datetime.fromisoformat
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a Supabase timestamp; fromisoformat reads the trailing 'Z' itself on Python 3.11+"""
+    return _fromisoformat(value) if value else None
+
+def _to_decimal(value) -> Decimal:
+    """Convert a Supabase numeric (JSON number or string) to Decimal without a str() round-trip"""
+    value_type = type(value)
+    if value_type is Decimal:
+        return value
+    if value_type is str or value_type is int:
+        return Decimal(value)
+    # Floats go through their shortest repr so 1.1 becomes Decimal('1.1'), not the binary expansion
+    return Decimal(repr(value))
+
+@dataclass(slots=True)
 class Organization:
     """Organization model for multi-tenancy"""
     id: UUID = field(default_factory=uuid4)
@@ -55,16 +72,16 @@ class Organization:
             subscription_plan=data.get('subscription_plan', 'starter'),
             stripe_customer_id=data.get('stripe_customer_id'),
             stripe_subscription_id=data.get('stripe_subscription_id'),
-            trial_ends_at=datetime.fromisoformat(data['trial_ends_at'].replace('Z', '+00:00')) if data.get('trial_ends_at') else None,
+            trial_ends_at=_parse_timestamp(data.get('trial_ends_at')),
             monthly_po_limit=data.get('monthly_po_limit', 50),
             monthly_po_count=data.get('monthly_po_count', 0),
-            reset_date=datetime.fromisoformat(data['reset_date']) if data.get('reset_date') else None,
+            reset_date=_parse_timestamp(data.get('reset_date')),
             is_active=data.get('is_active', True),
-            created_at=datetime.fromisoformat(data['created_at'].replace('Z', '+00:00')) if data.get('created_at') else None,
-            updated_at=datetime.fromisoformat(data['updated_at'].replace('Z', '+00:00')) if data.get('updated_at') else None
+            created_at=_parse_timestamp(data.get('created_at')),
+            updated_at=_parse_timestamp(data.get('updated_at'))
         )
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """User model for Supabase Auth integration"""
     id: UUID = field(default_factory=uuid4)
@@ -100,11 +117,11 @@ class User:
             role=data.get('role', 'member'),
             is_admin=data.get('is_admin', False),
             is_active=data.get('is_active', True),
-            created_at=datetime.fromisoformat(data['created_at'].replace('Z', '+00:00')) if data.get('created_at') else None,
-            updated_at=datetime.fromisoformat(data['updated_at'].replace('Z', '+00:00')) if data.get('updated_at') else None
+            created_at=_parse_timestamp(data.get('created_at')),
+            updated_at=_parse_timestamp(data.get('updated_at'))
         )
 
-@dataclass
+@dataclass(slots=True)
 class PriceBook:
     """Price book model with organization support"""
     id: UUID = field(default_factory=uuid4)
@@ -131,11 +148,11 @@ class PriceBook:
             organization_id=UUID(data['organization_id']),
             name=data.get('name', ''),
             user_id=UUID(data['user_id']) if data.get('user_id') else None,
-            created_at=datetime.fromisoformat(data['created_at'].replace('Z', '+00:00')) if data.get('created_at') else None,
-            updated_at=datetime.fromisoformat(data['updated_at'].replace('Z', '+00:00')) if data.get('updated_at') else None
+            created_at=_parse_timestamp(data.get('created_at')),
+            updated_at=_parse_timestamp(data.get('updated_at'))
         )
 
-@dataclass
+@dataclass(slots=True)
 class PriceItem:
     """Price item model"""
     id: UUID = field(default_factory=uuid4)
@@ -164,13 +181,13 @@ class PriceItem:
             id=UUID(data['id']),
             price_book_id=UUID(data['price_book_id']),
             model_number=data.get('model_number', ''),
-            price=Decimal(str(data.get('price', '0.00'))),
+            price=_to_decimal(data.get('price', '0.00')),
             source_column=data.get('source_column'),
             excel_row=data.get('excel_row'),
-            created_at=datetime.fromisoformat(data['created_at'].replace('Z', '+00:00')) if data.get('created_at') else None
+            created_at=_parse_timestamp(data.get('created_at'))
         )
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedPO:
     """Processed PO model with organization support"""
     id: UUID = field(default_factory=uuid4)
@@ -199,10 +216,10 @@ class ProcessedPO:
             filename=data.get('filename', ''),
             price_book_id=UUID(data['price_book_id']),
             user_id=UUID(data['user_id']) if data.get('user_id') else None,
-            processed_at=datetime.fromisoformat(data['processed_at'].replace('Z', '+00:00')) if data.get('processed_at') else None
+            processed_at=_parse_timestamp(data.get('processed_at'))
         )
 
-@dataclass
+@dataclass(slots=True)
 class POLineItem:
     """PO line item model"""
     id: UUID = field(default_factory=uuid4)
@@ -233,9 +250,9 @@ class POLineItem:
             id=UUID(data['id']),
             processed_po_id=UUID(data['processed_po_id']),
             model_number=data.get('model_number', ''),
-            po_price=Decimal(str(data.get('po_price', '0.00'))),
-            book_price=Decimal(str(data['book_price'])) if data.get('book_price') else None,
+            po_price=_to_decimal(data.get('po_price', '0.00')),
+            book_price=_to_decimal(data['book_price']) if data.get('book_price') else None,
             status=data.get('status', ''),
-            discrepancy=Decimal(str(data['discrepancy'])) if data.get('discrepancy') else None,
-            created_at=datetime.fromisoformat(data['created_at'].replace('Z', '+00:00')) if data.get('created_at') else None
+            discrepancy=_to_decimal(data['discrepancy']) if data.get('discrepancy') else None,
+            created_at=_parse_timestamp(data.get('created_at'))
         ) 
\ No newline at end of file
@@ -3,22 +3,61 @@ Base repository class for Supabase operations
 Provides common CRUD operations with RLS support
 """
 
-from typing import TypeVar, Generic, List, Optional, Dict, Any
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar, Generic, Iterator, List, Optional, Dict, Any
 from uuid import UUID
 from utils.supabase_client import get_supabase_client
 from utils.db_adapter import get_db_adapter
 
 T = TypeVar('T')
 
+# Rows per insert request, and how many of those requests run at once
+BULK_INSERT_CHUNK_SIZE = 1000
+BULK_INSERT_WORKERS = 8
+
+# Rows per page when iterating a table (Supabase caps responses at 1000 rows by default)
+ITER_PAGE_SIZE = 1000
+
+@functools.lru_cache(maxsize=1)
+def get_repository_client():
+    """
+    Anon Supabase client shared by every repository instance
+    
+    Repositories never sign in on this client, so it holds no per-user session
+    and can be reused across requests along with its HTTP connections.
+    """
+    return get_supabase_client()
+
+def contains_pattern(term: str) -> str:
+    """ILIKE pattern matching term anywhere, with LIKE wildcards in term escaped"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def or_ilike_filter(columns: List[str], term: str) -> str:
+    """
+    PostgREST or=(...) filter matching term anywhere in any of columns
+    
+    The pattern is double-quoted so commas and parentheses in term cannot break
+    the filter syntax; PostgREST strips one level of backslash escaping in quotes.
+    """
+    quoted = contains_pattern(term).replace('\\', '\\\\').replace('"', '\\"')
+    return ','.join(f'{column}.ilike."{quoted}"' for column in columns)
+
 class BaseRepository(Generic[T]):
     """Base repository for Supabase operations with RLS support"""
     
     def __init__(self, table_name: str, model_class: type):
         self.table_name = table_name
         self.model_class = model_class
-        self.client = get_supabase_client()
+        self.client = get_repository_client()
         self.db_adapter = get_db_adapter()
     
+    @staticmethod
+    def _normalize_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Equality filters with UUID values converted to strings for PostgREST"""
+        return {key: str(value) if isinstance(value, UUID) else value for key, value in filters.items()}
+    
     def create(self, data: dict) -> Optional[T]:
         """Create a new record"""
         try:
@@ -56,10 +95,7 @@ class BaseRepository(Generic[T]):
             
             # Apply filters
             if filters:
-                for key, value in filters.items():
-                    if isinstance(value, UUID):
-                        value = str(value)
-                    query = query.eq(key, value)
+                query = query.match(self._normalize_filters(filters))
             
             # Apply limit
             if limit:
@@ -68,12 +104,42 @@ class BaseRepository(Generic[T]):
             response = query.execute()
             
             if response.data:
-                return [self.model_class.from_dict(item) for item in response.data]
+                return list(map(self.model_class.from_dict, response.data))
             return []
         except Exception as e:
             print(f"Error getting all {self.table_name}: {e}")
             return []
     
+    def iter_all(self, filters: Dict[str, Any] = None, page_size: int = ITER_PAGE_SIZE) -> Iterator[T]:
+        """
+        Yield every matching record, fetching page_size rows per request (respects RLS)
+        
+        Only one page is hydrated and held at a time, so callers that iterate once
+        can walk large tables without building the whole list.
+        """
+        self.db_adapter.log_operation(f"ITER ALL {self.table_name}", "supabase")
+        start = 0
+        while True:
+            try:
+                # Ordered by id so pages don't overlap or skip rows
+                query = self.client.table(self.table_name).select("*").order('id')
+                if filters:
+                    query = query.match(self._normalize_filters(filters))
+                rows = query.range(start, start + page_size - 1).execute().data or []
+            except Exception as e:
+                print(f"Error iterating {self.table_name}: {e}")
+                return
+            
+            yield from map(self.model_class.from_dict, rows)
+            if len(rows) < page_size:
+                return
+            start += page_size
+    
+    def get_one(self, filters: Dict[str, Any]) -> Optional[T]:
+        """Get the first record matching the filters, fetching at most one row (respects RLS)"""
+        results = self.get_all(filters, limit=1)
+        return results[0] if results else None
+    
     def update(self, id: UUID, data: dict) -> Optional[T]:
         """Update a record (respects RLS)"""
         try:
@@ -108,14 +174,11 @@ class BaseRepository(Generic[T]):
         """Count records with optional filters (respects RLS)"""
         try:
             self.db_adapter.log_operation(f"COUNT {self.table_name}", "supabase")
-            query = self.client.table(self.table_name).select("id", count="exact")
+            query = self.client.table(self.table_name).select("id", count="exact", head=True)
             
             # Apply filters
             if filters:
-                for key, value in filters.items():
-                    if isinstance(value, UUID):
-                        value = str(value)
-                    query = query.eq(key, value)
+                query = query.match(self._normalize_filters(filters))
             
             response = query.execute()
             return response.count if response.count is not None else 0
@@ -126,21 +189,40 @@ class BaseRepository(Generic[T]):
     def exists(self, id: UUID) -> bool:
         """Check if record exists (respects RLS)"""
         try:
-            record = self.get_by_id(id)
-            return record is not None
+            self.db_adapter.log_operation(f"EXISTS {self.table_name}", "supabase")
+            # HEAD request: PostgREST returns only the count, no rows to transfer or hydrate
+            response = self.client.table(self.table_name)\
+                .select("id", count="exact", head=True)\
+                .eq('id', str(id))\
+                .execute()
+            return bool(response.count)
         except Exception as e:
             print(f"Error checking existence in {self.table_name}: {e}")
             return False
     
+    def _insert_chunked(self, table_name: str, data_list: List[dict]) -> List[dict]:
+        """
+        Insert rows in BULK_INSERT_CHUNK_SIZE requests, up to BULK_INSERT_WORKERS at a time
+        
+        Chunks are separate statements, so a failure can leave earlier chunks inserted.
+        Returns the inserted rows in input order; raises if any chunk fails.
+        """
+        def insert_chunk(chunk):
+            return self.client.table(table_name).insert(chunk).execute().data or []
+        
+        chunks = [data_list[i:i + BULK_INSERT_CHUNK_SIZE] for i in range(0, len(data_list), BULK_INSERT_CHUNK_SIZE)]
+        if len(chunks) <= 1:
+            return [row for chunk in chunks for row in insert_chunk(chunk)]
+        
+        with ThreadPoolExecutor(max_workers=min(BULK_INSERT_WORKERS, len(chunks))) as executor:
+            return [row for rows in executor.map(insert_chunk, chunks) for row in rows]
+    
     def bulk_create(self, data_list: List[dict]) -> List[T]:
-        """Create multiple records in a single operation"""
+        """Create multiple records, sending large lists as concurrent chunked inserts"""
         try:
             self.db_adapter.log_operation(f"BULK CREATE {self.table_name}", "supabase")
-            response = self.client.table(self.table_name).insert(data_list).execute()
-            
-            if response.data:
-                return [self.model_class.from_dict(item) for item in response.data]
-            return []
+            rows = self._insert_chunked(self.table_name, data_list)
+            return list(map(self.model_class.from_dict, rows))
         except Exception as e:
             print(f"Error bulk creating {self.table_name}: {e}")
             return [] 
\ No newline at end of file
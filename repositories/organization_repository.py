@@ -3,11 +3,18 @@ Organization Repository for Supabase operations
 Handles organization management and subscription tracking
 """
 
+import functools
+import time
 from typing import List, Optional
 from uuid import UUID
-from repositories.base import BaseRepository
+from repositories.base import BaseRepository, or_ilike_filter
 from models.supabase_models import Organization
 
+# Enterprise organizations have no PO limit, so check_po_limit can answer them
+# without a fetch; entries expire so plan changes made elsewhere are picked up
+ENTERPRISE_CACHE_TTL = 30  # seconds
+_enterprise_orgs = {}  # org ID (str) -> monotonic expiry time
+
 class OrganizationRepository(BaseRepository[Organization]):
     """Repository for organization operations"""
     
@@ -16,13 +23,11 @@ class OrganizationRepository(BaseRepository[Organization]):
     
     def get_by_slug(self, slug: str) -> Optional[Organization]:
         """Get organization by slug"""
-        results = self.get_all({'slug': slug})
-        return results[0] if results else None
+        return self.get_one({'slug': slug})
     
     def get_by_stripe_customer_id(self, customer_id: str) -> Optional[Organization]:
         """Get organization by Stripe customer ID"""
-        results = self.get_all({'stripe_customer_id': customer_id})
-        return results[0] if results else None
+        return self.get_one({'stripe_customer_id': customer_id})
     
     def get_active_organizations(self) -> List[Organization]:
         """Get all active organizations"""
@@ -32,17 +37,38 @@ class OrganizationRepository(BaseRepository[Organization]):
         """Get organizations in trial status"""
         return self.get_all({'subscription_status': 'trial'})
     
-    def increment_po_count(self, org_id: UUID) -> bool:
-        """Increment monthly PO count for organization"""
+    def try_consume_po(self, org_id: UUID) -> dict:
+        """
+        Atomically check the monthly PO limit and count one PO against it
+        
+        One RPC instead of check_po_limit followed by an increment, so concurrent
+        uploads cannot overshoot the limit. Not wired into any PO insert path yet:
+        while the processed_pos quota triggers exist they already count each PO, so
+        calling this as well would count it twice (see 006_try_consume_po.sql)
+        """
         try:
-            # This is handled by database trigger, but we can also do it manually
-            response = self.client.rpc('increment_organization_po_count', {
+            response = self.client.rpc('try_consume_po', {
                 'org_id': str(org_id)
             }).execute()
-            return True
+            result = response.data or {}
+            
+            if not result.get('ok'):
+                return {'can_process': False, 'reason': 'Monthly PO limit reached or organization inactive'}
+            
+            remaining = result.get('remaining')
+            return {
+                'can_process': True,
+                'remaining': 'unlimited' if remaining is None else remaining,
+                'limit': result.get('limit'),
+                'used': result.get('used')
+            }
         except Exception as e:
-            print(f"Error incrementing PO count: {e}")
-            return False
+            print(f"Error consuming PO quota: {e}")
+            return {'can_process': False, 'reason': f'Error: {e}'}
+    
+    def increment_po_count(self, org_id: UUID) -> bool:
+        """Increment monthly PO count for organization (if still under its limit)"""
+        return self.try_consume_po(org_id)['can_process']
     
     def reset_monthly_count(self, org_id: UUID) -> bool:
         """Reset monthly PO count for organization"""
@@ -64,6 +90,9 @@ class OrganizationRepository(BaseRepository[Organization]):
     def check_po_limit(self, org_id: UUID) -> dict:
         """Check if organization can process more POs"""
         try:
+            if _enterprise_orgs.get(str(org_id), 0) > time.monotonic():
+                return {'can_process': True, 'remaining': 'unlimited'}
+            
             org = self.get_by_id(org_id)
             if not org:
                 return {'can_process': False, 'reason': 'Organization not found'}
@@ -73,6 +102,7 @@ class OrganizationRepository(BaseRepository[Organization]):
             
             # Enterprise has unlimited
             if org.subscription_plan == 'enterprise':
+                _enterprise_orgs[str(org_id)] = time.monotonic() + ENTERPRISE_CACHE_TTL
                 return {'can_process': True, 'remaining': 'unlimited'}
             
             # Check monthly limit
@@ -110,6 +140,7 @@ class OrganizationRepository(BaseRepository[Organization]):
             if stripe_subscription_id:
                 data['stripe_subscription_id'] = stripe_subscription_id
             
+            _enterprise_orgs.pop(str(org_id), None)
             return self.update(org_id, data)
         except Exception as e:
             print(f"Error updating subscription: {e}")
@@ -124,12 +155,17 @@ class OrganizationRepository(BaseRepository[Organization]):
         try:
             response = self.client.table(self.table_name)\
                 .select("*")\
-                .or_(f'name.ilike.%{search_term}%,slug.ilike.%{search_term}%')\
+                .or_(or_ilike_filter(['name', 'slug'], search_term))\
                 .execute()
             
             if response.data:
-                return [self.model_class.from_dict(item) for item in response.data]
+                return list(map(self.model_class.from_dict, response.data))
             return []
         except Exception as e:
             print(f"Error searching organizations: {e}")
-            return [] 
\ No newline at end of file
+            return []
+
+@functools.lru_cache(maxsize=1)
+def get_organization_repository() -> OrganizationRepository:
+    """Process-wide OrganizationRepository, created on first use"""
+    return OrganizationRepository()
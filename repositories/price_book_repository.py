@@ -5,7 +5,7 @@ Handles price books with organization-level isolation
 
 from typing import List, Optional
 from uuid import UUID
-from repositories.base import BaseRepository
+from repositories.base import BaseRepository, contains_pattern
 from models.supabase_models import PriceBook, PriceItem
 
 class PriceBookRepository(BaseRepository[PriceBook]):
@@ -20,26 +20,24 @@ class PriceBookRepository(BaseRepository[PriceBook]):
     
     def get_by_name_and_org(self, name: str, org_id: UUID) -> Optional[PriceBook]:
         """Get price book by name within organization"""
-        results = self.get_all({'name': name, 'organization_id': org_id})
-        return results[0] if results else None
+        return self.get_one({'name': name, 'organization_id': org_id})
     
     def get_with_items(self, price_book_id: UUID) -> dict:
         """Get price book with all its items"""
         try:
-            # Get price book
-            price_book = self.get_by_id(price_book_id)
-            if not price_book:
-                return None
-            
-            # Get items using separate query
-            items_response = self.client.table('price_items')\
-                .select("*")\
-                .eq('price_book_id', str(price_book_id))\
+            self.db_adapter.log_operation(f"GET {self.table_name} with items", "supabase")
+            # Embed the items so the book and its items come back in one request
+            response = self.client.table(self.table_name)\
+                .select("*, price_items(*)")\
+                .eq('id', str(price_book_id))\
                 .execute()
             
-            items = []
-            if items_response.data:
-                items = [PriceItem.from_dict(item) for item in items_response.data]
+            if not response.data:
+                return None
+            
+            row = response.data[0]
+            items = list(map(PriceItem.from_dict, row.pop('price_items') or []))
+            price_book = self.model_class.from_dict(row)
             
             return {
                 'price_book': price_book,
@@ -50,26 +48,34 @@ class PriceBookRepository(BaseRepository[PriceBook]):
             print(f"Error getting price book with items: {e}")
             return None
     
+    def count_items(self, price_book_id: UUID) -> int:
+        """Count a price book's items without fetching them (respects RLS)"""
+        try:
+            self.db_adapter.log_operation("COUNT price_items", "supabase")
+            # HEAD request: only the count comes back, no item rows
+            response = self.client.table('price_items')\
+                .select("id", count="exact", head=True)\
+                .eq('price_book_id', str(price_book_id))\
+                .execute()
+            return response.count or 0
+        except Exception as e:
+            print(f"Error counting price book items: {e}")
+            return 0
+    
     def create_with_items(self, price_book_data: dict, items_data: List[dict]) -> Optional[dict]:
-        """Create price book and its items in a transaction"""
+        """Create price book and its items in one transaction (one RPC round trip)"""
         try:
-            # Create price book first
-            price_book = self.create(price_book_data)
-            if not price_book:
+            self.db_adapter.log_operation(f"CREATE {self.table_name} with items", "supabase")
+            # The RPC assigns price_book_id to every item
+            response = self.client.rpc('create_price_book_with_items', {
+                'book': price_book_data,
+                'items': items_data
+            }).execute()
+            if not response.data:
                 return None
             
-            # Add price_book_id to all items
-            for item_data in items_data:
-                item_data['price_book_id'] = str(price_book.id)
-            
-            # Create items in bulk
-            items_response = self.client.table('price_items')\
-                .insert(items_data)\
-                .execute()
-            
-            items = []
-            if items_response.data:
-                items = [PriceItem.from_dict(item) for item in items_response.data]
+            price_book = self.model_class.from_dict(response.data['book'])
+            items = list(map(PriceItem.from_dict, response.data['items']))
             
             return {
                 'price_book': price_book,
@@ -90,11 +96,11 @@ class PriceBookRepository(BaseRepository[PriceBook]):
             response = self.client.table(self.table_name)\
                 .select("*")\
                 .eq('organization_id', str(org_id))\
-                .ilike('name', f'%{search_term}%')\
+                .ilike('name', contains_pattern(search_term))\
                 .execute()
             
             if response.data:
-                return [self.model_class.from_dict(item) for item in response.data]
+                return list(map(self.model_class.from_dict, response.data))
             return []
         except Exception as e:
             print(f"Error searching price books: {e}")
@@ -111,7 +117,7 @@ class PriceBookRepository(BaseRepository[PriceBook]):
                 .execute()
             
             if response.data:
-                return [self.model_class.from_dict(item) for item in response.data]
+                return list(map(self.model_class.from_dict, response.data))
             return []
         except Exception as e:
             print(f"Error getting recent price books: {e}")
@@ -1,10 +1,40 @@
 from typing import Dict, List, Optional, Any
-from .base import BaseRepository
+from .base import BaseRepository, get_repository_client, or_ilike_filter
+import functools
+import logging
+import threading
 import uuid
 
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Seconds a fetched user profile is served from memory by get_by_id/get_by_email
+USER_CACHE_TTL = 30
+USER_CACHE_SIZE = 10_000
+
+# Repeat logins within this many seconds don't rewrite last_login_at
+LAST_LOGIN_DEBOUNCE = 300
+
+def _select_with(include: Optional[List[str]] = None) -> str:
+    """Build a select string that embeds the given related tables (e.g. ['organizations'])"""
+    return "*" + "".join(f", {relation}(*)" for relation in include or [])
+
 class UserRepository(BaseRepository):
     """Repository for user operations with organization-aware access control"""
     
+    # Shared by all instances (routes create one per request); only found users are cached
+    _id_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+    _email_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+    _cache_lock = threading.RLock()
+    _recent_logins = TTLCache(maxsize=50_000, ttl=LAST_LOGIN_DEBOUNCE)
+    
+    _VALID_ROLES = frozenset(('owner', 'admin', 'member'))
+    _ALLOWED_PROFILE_FIELDS = frozenset((
+        'username', 'first_name', 'last_name',
+        'phone', 'timezone', 'language', 'avatar_url'
+    ))
+    
     def __init__(self):
         self.table_name = 'users'
         # Initialize Supabase client only when needed
@@ -14,10 +44,35 @@ class UserRepository(BaseRepository):
     def _init_client(self):
         """Initialize Supabase client"""
         try:
-            from utils.supabase_client import get_supabase_client
-            self.supabase = get_supabase_client()
+            self.supabase = get_repository_client()
         except Exception as e:
-            print(f"Warning: Could not initialize Supabase client: {e}")
+            logger.warning("Could not initialize Supabase client: %s", e)
+    
+    @classmethod
+    def _cache_user(cls, user: Dict[str, Any]):
+        """Remember a fetched user under both its ID and email
+        
+        Stores a copy, and lookups hand out copies, so callers that modify the
+        dict they get back can't change what other requests are served
+        """
+        user = dict(user)
+        with cls._cache_lock:
+            cls._id_cache[user['id']] = user
+            if user.get('email'):
+                cls._email_cache[user['email']] = user
+    
+    @classmethod
+    def invalidate(cls, user_id: str, email: Optional[str] = None):
+        """Drop a user from the lookup caches after it changes
+        
+        Args:
+            user_id: User UUID
+            email: Email to drop as well, if it may differ from the cached one
+        """
+        with cls._cache_lock:
+            cached = cls._id_cache.pop(str(user_id), None)
+            for cached_email in {email, cached and cached.get('email')} - {None}:
+                cls._email_cache.pop(cached_email, None)
     
     def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create a new user with profile information
@@ -48,16 +103,18 @@ class UserRepository(BaseRepository):
         
         try:
             result = self.supabase.table(self.table_name).insert(user_data).execute()
+            self.invalidate(user_data['id'], user_data['email'])
             return result.data[0] if result.data else None
-        except Exception as e:
-            print(f"Error creating user: {e}")
+        except Exception:
+            logger.exception("Error creating user")
             return None
     
-    def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def get_by_id(self, user_id: str, fields: str = "*") -> Optional[Dict[str, Any]]:
         """Get user by ID
         
         Args:
             user_id: User UUID
+            fields: PostgREST column projection; a cached full row may be returned instead
             
         Returns:
             User data or None if not found
@@ -65,23 +122,34 @@ class UserRepository(BaseRepository):
         if not self.supabase:
             return None  # Return None for testing
         
+        with self._cache_lock:
+            cached = self._id_cache.get(str(user_id))
+        if cached is not None:
+            return dict(cached)
+        
         try:
             result = self.supabase.table(self.table_name)\
-                .select("*")\
+                .select(fields)\
                 .eq('id', user_id)\
                 .single()\
                 .execute()
             
-            return result.data if result.data else None
-        except Exception as e:
-            print(f"Error getting user by ID: {e}")
+            if not result.data:
+                return None
+            # Only full rows go in the cache, so every cached entry satisfies any projection
+            if fields == "*":
+                self._cache_user(result.data)
+            return result.data
+        except Exception:
+            logger.exception("Error getting user by ID")
             return None
     
-    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+    def get_by_email(self, email: str, fields: str = "*") -> Optional[Dict[str, Any]]:
         """Get user by email address
         
         Args:
             email: User's email address
+            fields: PostgREST column projection; a cached full row may be returned instead
             
         Returns:
             User data or None if not found
@@ -89,18 +157,79 @@ class UserRepository(BaseRepository):
         if not self.supabase:
             return None  # Return None for testing
         
+        with self._cache_lock:
+            cached = self._email_cache.get(email)
+        if cached is not None:
+            return dict(cached)
+        
         try:
             result = self.supabase.table(self.table_name)\
-                .select("*")\
+                .select(fields)\
                 .eq('email', email)\
                 .single()\
                 .execute()
             
-            return result.data if result.data else None
-        except Exception as e:
-            print(f"Error getting user by email: {e}")
+            if not result.data:
+                return None
+            # Only full rows go in the cache, so every cached entry satisfies any projection
+            if fields == "*":
+                self._cache_user(result.data)
+            return result.data
+        except Exception:
+            logger.exception("Error getting user by email")
             return None
     
+    def get_by_ids(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many users by ID in one request
+        
+        Args:
+            user_ids: User UUIDs
+            
+        Returns:
+            Dict of user data keyed by user ID; missing users are left out
+        """
+        return self._get_many('id', [str(user_id) for user_id in user_ids], self._id_cache)
+    
+    def get_by_emails(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many users by email address in one request
+        
+        Args:
+            emails: Email addresses
+            
+        Returns:
+            Dict of user data keyed by email; missing users are left out
+        """
+        return self._get_many('email', emails, self._email_cache)
+    
+    def _get_many(self, column: str, keys: List[str], cache: TTLCache) -> Dict[str, Dict[str, Any]]:
+        """Serve what we can from cache and fetch the rest with a single IN filter"""
+        if not self.supabase or not keys:
+            return {}
+        
+        found = {}
+        with self._cache_lock:
+            for key in keys:
+                cached = cache.get(key)
+                if cached is not None:
+                    found[key] = dict(cached)
+        missing = list(set(keys) - found.keys())
+        if not missing:
+            return found
+        
+        try:
+            result = self.supabase.table(self.table_name)\
+                .select("*")\
+                .in_(column, missing)\
+                .execute()
+        except Exception:
+            logger.exception("Error getting users by %s", column)
+            return found
+        
+        for user in result.data or []:
+            self._cache_user(user)
+            found[user[column]] = user
+        return found
+    
     def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username
         
@@ -118,17 +247,19 @@ class UserRepository(BaseRepository):
         
         return result.data if result.data else None
     
-    def get_by_organization(self, organization_id: str) -> List[Dict[str, Any]]:
+    def get_by_organization(self, organization_id: str,
+                            include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Get all users in an organization
         
         Args:
             organization_id: Organization UUID
+            include: Related tables to embed in each row, e.g. ['organizations']
             
         Returns:
             List of user data
         """
         result = self.supabase.table(self.table_name)\
-            .select("*")\
+            .select(_select_with(include))\
             .eq('organization_id', organization_id)\
             .execute()
         
@@ -144,9 +275,8 @@ class UserRepository(BaseRepository):
         Returns:
             Updated user data or None if failed
         """
-        valid_roles = ['owner', 'admin', 'member']
-        if role not in valid_roles:
-            raise ValueError(f"Invalid role. Must be one of: {valid_roles}")
+        if role not in self._VALID_ROLES:
+            raise ValueError(f"Invalid role. Must be one of: {sorted(self._VALID_ROLES)}")
         
         return self.update(user_id, {'role': role})
     
@@ -169,9 +299,15 @@ class UserRepository(BaseRepository):
                 .eq('id', user_id)\
                 .execute()
             
-            return result.data[0] if result.data else None
-        except Exception as e:
-            print(f"Error updating user: {e}")
+            # Covers update_role, update_profile, activate/deactivate, verify_email and last login.
+            # PostgREST returns the updated row, so cache it rather than re-reading on the next lookup
+            self.invalidate(user_id, data.get('email'))
+            updated = result.data[0] if result.data else None
+            if updated:
+                self._cache_user(updated)
+            return updated
+        except Exception:
+            logger.exception("Error updating user")
             return None
     
     def update_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -184,16 +320,10 @@ class UserRepository(BaseRepository):
         Returns:
             Updated user data or None if failed
         """
-        # Allowed profile fields
-        allowed_fields = [
-            'username', 'first_name', 'last_name', 
-            'phone', 'timezone', 'language', 'avatar_url'
-        ]
-        
         # Filter to only allowed fields
         filtered_data = {
             key: value for key, value in profile_data.items()
-            if key in allowed_fields
+            if key in self._ALLOWED_PROFILE_FIELDS
         }
         
         if not filtered_data:
@@ -234,17 +364,19 @@ class UserRepository(BaseRepository):
         """
         return self.update(user_id, {'email_verified': True})
     
-    def get_organization_admins(self, organization_id: str) -> List[Dict[str, Any]]:
+    def get_organization_admins(self, organization_id: str,
+                                include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Get all admin users in an organization
         
         Args:
             organization_id: Organization UUID
+            include: Related tables to embed in each row, e.g. ['organizations']
             
         Returns:
             List of admin user data
         """
         result = self.supabase.table(self.table_name)\
-            .select("*")\
+            .select(_select_with(include))\
             .eq('organization_id', organization_id)\
             .in_('role', ['owner', 'admin'])\
             .execute()
@@ -269,38 +401,59 @@ class UserRepository(BaseRepository):
         
         return result.data if result.data else None
     
-    def search_users(self, organization_id: str, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    def get_organization_leadership(self, organization_id: str,
+                                    include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get an organization's owner and admins in one request
+        
+        Args:
+            organization_id: Organization UUID
+            include: Related tables to embed in each row, e.g. ['organizations']
+            
+        Returns:
+            Dict with 'owner' (user data or None) and 'admins' (role 'admin' only)
+        """
+        leaders = self.get_organization_admins(organization_id, include)
+        return {
+            'owner': next((user for user in leaders if user['role'] == 'owner'), None),
+            'admins': [user for user in leaders if user['role'] == 'admin']
+        }
+    
+    def search_users(self, organization_id: str, query: str, limit: int = 20,
+                     include: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Search users within an organization
         
         Args:
             organization_id: Organization UUID
-            query: Search query (username, email, name)
+            query: Search query (username or email)
             limit: Maximum results to return
+            include: Related tables to embed in each row, e.g. ['organizations']
             
         Returns:
             List of matching user data
         """
-        # Search in username, email, first_name, last_name
+        # Substring match on username/email, served by the pg_trgm indexes
         result = self.supabase.table(self.table_name)\
-            .select("*")\
+            .select(_select_with(include))\
             .eq('organization_id', organization_id)\
-            .or_(f"username.ilike.%{query}%,email.ilike.%{query}%,first_name.ilike.%{query}%,last_name.ilike.%{query}%")\
+            .or_(or_ilike_filter(['username', 'email'], query))\
             .limit(limit)\
             .execute()
         
         return result.data or []
     
-    def get_user_with_organization(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def get_user_with_organization(self, user_id: str,
+                                   fields: str = "*, organizations(*)") -> Optional[Dict[str, Any]]:
         """Get user data with organization information
         
         Args:
             user_id: User UUID
+            fields: PostgREST column projection, including the organizations embed
             
         Returns:
             User data with organization details or None if not found
         """
         result = self.supabase.table(self.table_name)\
-            .select("*, organizations(*)")\
+            .select(fields)\
             .eq('id', user_id)\
             .single()\
             .execute()
@@ -314,13 +467,22 @@ class UserRepository(BaseRepository):
             user_id: User UUID
             
         Returns:
-            Updated user data or None if failed
+            Updated user data, or None if failed or skipped as a recent repeat login
         """
         from datetime import datetime
         
-        return self.update(user_id, {
+        with self._cache_lock:
+            if str(user_id) in self._recent_logins:
+                return None
+        
+        updated = self.update(user_id, {
             'last_login_at': datetime.utcnow().isoformat()
         })
+        # Only a successful write starts the debounce window, so a failed one is retried next login
+        if updated is not None:
+            with self._cache_lock:
+                self._recent_logins[str(user_id)] = True
+        return updated
     
     def get_active_users_count(self, organization_id: str) -> int:
         """Get count of active users in organization
@@ -332,7 +494,7 @@ class UserRepository(BaseRepository):
             Number of active users
         """
         result = self.supabase.table(self.table_name)\
-            .select("id", count="exact")\
+            .select("id", count="exact", head=True)\
             .eq('organization_id', organization_id)\
             .eq('is_active', True)\
             .execute()
@@ -355,8 +517,15 @@ class UserRepository(BaseRepository):
                 .in_('id', user_ids)\
                 .execute()
             
+            for user_id in user_ids:
+                self.invalidate(user_id)
             return bool(result.data)
             
-        except Exception as e:
-            print(f"Error in bulk update: {e}")
-            return False 
\ No newline at end of file
+        except Exception:
+            logger.exception("Error in bulk update")
+            return False 
+
+@functools.lru_cache(maxsize=1)
+def get_user_repository() -> UserRepository:
+    """Process-wide UserRepository, so request handlers don't rebuild one per call"""
+    return UserRepository()
@@ -2,13 +2,18 @@ from flask import Blueprint, render_template, request, jsonify, session, redirec
 from utils.supabase_auth import supabase_auth
 from utils.db_adapter import db_adapter, DatabaseMode
 from utils.auth_decorators import login_required, get_current_user
-from repositories.user_repository import UserRepository
-from repositories.organization_repository import OrganizationRepository
+from repositories.user_repository import get_user_repository
+from utils.supabase_client import get_supabase_admin_client
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.exc import IntegrityError
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bookkeeping writes (last login timestamp) that the response shouldn't wait on
+_background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='auth-bg')
+
 # Create authentication blueprint
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -38,41 +43,17 @@ def register():
                 return jsonify({"error": auth_result['error']}), 400
             
             try:
-                # Create organization
-                org_repo = OrganizationRepository()
-                org_slug = organization_name.lower().replace(' ', '-').replace('_', '-')
-                
-                # Ensure unique slug
-                counter = 1
-                original_slug = org_slug
-                while org_repo.get_by_slug(org_slug):
-                    org_slug = f"{original_slug}-{counter}"
-                    counter += 1
-                
-                org = org_repo.create({
-                    'name': organization_name,
-                    'slug': org_slug,
-                    'subscription_status': 'trial',
-                    'subscription_plan': 'starter'
-                })
-                
-                if not org:
-                    raise Exception("Failed to create organization")
+                # Create the organization (with a unique slug) and its owner's profile
+                # in one transaction; see register_user_with_org in the Supabase migrations
+                result = get_supabase_admin_client().rpc('register_user_with_org', {
+                    'p_user_id': auth_result['user'].id,
+                    'p_email': email,
+                    'p_username': username,
+                    'p_org_name': organization_name
+                }).execute()
                 
-                # Create user profile
-                user_repo = UserRepository()
-                user_profile = user_repo.create({
-                    'id': auth_result['user'].id,
-                    'email': email,
-                    'username': username,
-                    'organization_id': org['id'],
-                    'role': 'owner',  # First user is organization owner
-                    'is_active': True,
-                    'email_verified': True  # Supabase handles email verification
-                })
-                
-                if not user_profile:
-                    raise Exception("Failed to create user profile")
+                if not result.data:
+                    raise Exception("Failed to create organization and user profile")
                 
                 # Set session tokens
                 if auth_result['session']:
@@ -108,20 +89,26 @@ def register():
                     "redirect": url_for('dashboard')
                 })
             
-            # Check if user already exists
-            existing_user = User.query.filter_by(email=email).first()
-            if existing_user:
+            # Check email and username in one query
+            taken = db.session.execute(
+                db.select(User.email, User.username)
+                .where(db.or_(User.email == email, User.username == username))
+            ).all()
+            if any(row.email == email for row in taken):
                 return jsonify({"error": "Email already registered"}), 400
-            
-            existing_username = User.query.filter_by(username=username).first()
-            if existing_username:
+            if taken:
                 return jsonify({"error": "Username already taken"}), 400
             
             # Create user
             user = User(username=username, email=email)
             user.set_password(password)
             db.session.add(user)
-            db.session.commit()
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Both columns are unique; a concurrent registration got there first
+                db.session.rollback()
+                return jsonify({"error": "Email or username already taken"}), 400
             
             # For SQLAlchemy mode, we don't have organizations yet
             # This will be handled in Phase 4
@@ -161,8 +148,8 @@ def login():
                 return jsonify({"error": "Invalid email or password"}), 401
             
             # Verify user profile exists
-            user_repo = UserRepository()
-            user_profile = user_repo.get_by_id(auth_result['user'].id)
+            user_repo = get_user_repository()
+            user_profile = user_repo.get_by_id(auth_result['user'].id, fields="id")
             
             if not user_profile:
                 logger.error(f"User profile not found for authenticated user {auth_result['user'].id}")
@@ -173,8 +160,8 @@ def login():
             session['refresh_token'] = auth_result['session'].refresh_token
             session['user_id'] = auth_result['user'].id
             
-            # Update last login
-            user_repo.update_last_login(auth_result['user'].id)
+            # Update last login without holding up the response
+            _background_executor.submit(user_repo.update_last_login, auth_result['user'].id)
             
             logger.info(f"User {email} logged in successfully")
             
@@ -289,8 +276,10 @@ def get_profile():
         
         if db_adapter.mode == DatabaseMode.SUPABASE:
             # Get full user profile from repository
-            user_repo = UserRepository()
-            user_profile = user_repo.get_user_with_organization(current_user.id)
+            user_repo = get_user_repository()
+            user_profile = user_repo.get_user_with_organization(
+                current_user.id, fields="id, email, username, role, organizations(*)"
+            )
             
             if not user_profile:
                 return jsonify({"error": "User profile not found"}), 404
@@ -344,7 +333,7 @@ def update_profile():
             return jsonify({"error": "No data provided"}), 400
         
         if db_adapter.mode == DatabaseMode.SUPABASE:
-            user_repo = UserRepository()
+            user_repo = get_user_repository()
             
             # Update profile
             updated_profile = user_repo.update_profile(current_user.id, data)
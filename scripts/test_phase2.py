@@ -12,9 +12,10 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.supabase_client import get_supabase_client, get_supabase_admin_client
+from utils.supabase_client import get_supabase_admin_client
 from utils.db_adapter import get_db_adapter
 from models.supabase_models import Organization, User, PriceBook, PriceItem
+from repositories.base import get_repository_client
 from repositories.organization_repository import OrganizationRepository
 from repositories.price_book_repository import PriceBookRepository
 
@@ -22,7 +23,7 @@ class Phase2Tester:
     """Test suite for Phase 2 database migration functionality"""
     
     def __init__(self):
-        self.client = get_supabase_client()
+        self.client = get_repository_client()  # shared with the repositories
         self.admin_client = get_supabase_admin_client()
         self.db_adapter = get_db_adapter()
         self.org_repo = OrganizationRepository()
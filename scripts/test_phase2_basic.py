@@ -11,14 +11,14 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 # Import only what we need without triggering Flask app initialization
-from utils.supabase_client import get_supabase_client
 from utils.db_adapter import get_db_adapter
+from repositories.base import get_repository_client
 
 class BasicPhase2Tester:
     """Basic test suite for Phase 2 database migration functionality"""
     
     def __init__(self):
-        self.client = get_supabase_client()
+        self.client = get_repository_client()  # shared with the repositories
         self.db_adapter = get_db_adapter()
         
         self.test_results = {
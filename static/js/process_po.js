@@ -40,12 +40,18 @@ document.addEventListener('DOMContentLoaded', function() {
           <div class="spinner-border text-primary mb-3" role="status">
             <span class="visually-hidden">Processing...</span>
           </div>
-          <p>Processing Purchase Order...<br>This may take a minute.</p>
+          <p><span id="processing-step">Processing Purchase Order...</span><br>This may take a minute.</p>
         </div>
       </div>
     `;
     
-    // Submit the form
+    // Hide spinner and enable button once the job has finished
+    const resetButton = () => {
+      button.disabled = false;
+      spinner.classList.add('d-none');
+    };
+    
+    // Submit the form - the server queues the job and returns its ID
     fetch('/api/process-po', {
       method: 'POST',
       body: formData
@@ -53,16 +59,10 @@ document.addEventListener('DOMContentLoaded', function() {
     .then(response => response.json())
     .then(data => {
       if (data.error) {
-        showToast(data.error, 'danger');
-        document.getElementById('results-container').innerHTML = `
-          <div class="alert alert-danger">
-            <h5>Error Processing Purchase Order</h5>
-            <p>${data.error}</p>
-          </div>
-        `;
+        showProcessingError(data.error);
+        resetButton();
       } else {
-        showToast('Purchase Order processed successfully', 'success');
-        displayResults(data);
+        watchProcessingJob(data.status_url, resetButton);
       }
     })
     .catch(error => {
@@ -74,11 +74,7 @@ document.addEventListener('DOMContentLoaded', function() {
           <p>An unexpected error occurred: ${error.message}</p>
         </div>
       `;
-    })
-    .finally(() => {
-      // Hide spinner and enable button
-      button.disabled = false;
-      spinner.classList.add('d-none');
+      resetButton();
     });
   });
   }
@@ -87,6 +83,91 @@ document.addEventListener('DOMContentLoaded', function() {
   // since it's dynamically created
 });
 
+// Progress messages for each state of a PO processing job
+const PROCESSING_STEPS = {
+  PENDING: 'Waiting to start...',
+  EXTRACTING: 'Extracting line items from the PDF...',
+  COMPARING: 'Comparing prices against the price book...',
+  SAVING: 'Saving results...'
+};
+
+// How often to ask the server for a job's state
+const POLL_INTERVAL_MS = 1000;
+
+// Consecutive polls that may miss the job before giving up - without Redis only the
+// worker that accepted the upload knows the job, so other workers answer 404
+const MAX_MISSED_POLLS = 30;
+
+/**
+ * Polls a PO processing job's status until it finishes
+ * @param {string} statusUrl - The job's JSON status URL
+ * @param {Function} onDone - Called once the job succeeds or fails
+ */
+function watchProcessingJob(statusUrl, onDone) {
+  let missedPolls = 0;
+  
+  // A 404 or dropped request is usually transient, so poll again before failing the upload
+  const retry = (error) => {
+    missedPolls += 1;
+    if (missedPolls > MAX_MISSED_POLLS) {
+      showProcessingError(error);
+      onDone();
+    } else {
+      setTimeout(poll, POLL_INTERVAL_MS);
+    }
+  };
+  
+  const handleJob = (job) => {
+    if (!job) {
+      return;
+    }
+    missedPolls = 0;
+    
+    if (job.state === 'SUCCESS') {
+      showToast('Purchase Order processed successfully', 'success');
+      displayResults(job.result);
+      onDone();
+    } else if (job.state === 'FAILURE' || job.error) {
+      showProcessingError(job.error);
+      onDone();
+    } else {
+      const message = document.getElementById('processing-step');
+      if (message) {
+        message.textContent = PROCESSING_STEPS[job.state] || 'Processing Purchase Order...';
+      }
+      setTimeout(poll, POLL_INTERVAL_MS);
+    }
+  };
+  
+  const poll = () => {
+    fetch(statusUrl, { cache: 'no-store' })
+    .then(response => {
+      if (response.status === 404) {
+        retry('Lost track of the Purchase Order while it was processing');
+        return null;
+      }
+      return response.json();
+    })
+    .then(handleJob, () => retry('Lost connection while processing the Purchase Order'));
+  };
+  
+  poll();
+}
+
+/**
+ * Shows a processing error in the results area
+ * @param {string} error - The error message
+ */
+function showProcessingError(error) {
+  showToast(error, 'danger');
+  document.getElementById('results-container').innerHTML = `
+    <div class="alert alert-danger">
+      <h5>Error Processing Purchase Order</h5>
+      <p>${error}</p>
+    </div>
+  `;
+}
+
 /**
  * Loads the list of price books into the dropdown
  */
@@ -0,0 +1,57 @@
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+# app.py reads DATABASE_URL at import time, so point it at a throwaway SQLite file first
+_db_dir = tempfile.mkdtemp(prefix="orderguard-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/test.db")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app as flask_app, db  # noqa: E402
+from models import User  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username="tester", email="tester@example.com")
+    user.set_password("password")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client
+
+
+def make_workbook(rows):
+    """Build an in-memory .xlsx whose first row is the header"""
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import _dashboard_metrics, cache, db
+from models import POLineItem, PriceBook, ProcessedPO
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics_cache(app):
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def add_po(user, po_number, processed_at, statuses):
+    po = ProcessedPO(filename=f"PO_{po_number}.pdf", po_number=po_number, price_book_id="book-1",
+                     user_id=user.id, processed_at=processed_at)
+    db.session.add(po)
+    db.session.flush()
+    for status in statuses:
+        db.session.add(POLineItem(processed_po_id=po.id, model_number="M-1", po_price=10,
+                                  book_price=12 if status == "Mismatch" else 10, status=status))
+    return po
+
+
+def test_each_po_number_counts_once_using_its_latest_upload(user):
+    db.session.add(PriceBook(id="book-1", name="Book", user_id=user.id))
+    start = datetime(2024, 1, 1)
+    add_po(user, "123", start, ["Match", "Match"])
+    add_po(user, "123", start + timedelta(days=1), ["Match"])
+    add_po(user, "123", start + timedelta(days=2), ["Mismatch", "Model Not Found"])
+    add_po(user, "456", start, ["Match"])
+    db.session.commit()
+
+    metrics = _dashboard_metrics(user.id)
+
+    assert metrics["total_pos"] == 2
+    # Only the newest "123" upload and the single "456" upload contribute line items
+    assert metrics["total_lines_reviewed"] == 3
+    assert metrics["total_matches"] == 1
+    assert metrics["total_mismatches"] == 1
+    assert metrics["total_not_found"] == 1
+    assert metrics["total_savings"] == 2.0
@@ -0,0 +1,28 @@
+from conftest import make_workbook
+from utils.excel_parser import parse_excel_file
+
+
+def test_prices_round_like_two_decimal_formatting():
+    workbook = make_workbook([
+        ["Item Number", "Description", "Notes", "List", "Net"],
+        ["HALF-UP", None, None, None, 12.345],
+        ["HALF-DOWN", None, None, None, 2.675],
+        ["FROM-D", None, None, 0.125, None],
+    ])
+
+    price_data = parse_excel_file(workbook)
+    prices = dict(zip(price_data["model_number"], price_data["price"]))
+
+    assert prices == {
+        "HALF-UP": float(f"{12.345:.2f}"),
+        "HALF-DOWN": float(f"{2.675:.2f}"),
+        "FROM-D": float(f"{0.125:.2f}"),
+    }
+    assert prices["HALF-UP"] == 12.35
+    assert prices["HALF-DOWN"] == 2.67
+
+
+def test_header_only_workbook_parses_to_no_rows():
+    workbook = make_workbook([["Item Number", "Description", "Notes", "List", "Net"]])
+
+    assert parse_excel_file(workbook).empty
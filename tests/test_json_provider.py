@@ -0,0 +1,28 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+import app as app_module
+
+pytestmark = pytest.mark.skipif(app_module.orjson is None, reason="orjson not installed")
+
+PAYLOADS = [
+    {"b": 1, "a": datetime.datetime(2024, 1, 2, 3, 4, 5), "d": decimal.Decimal("1.50"), "u": uuid.UUID(int=5)},
+    {"name": "Café Größe", "note": "naïve — “quoted”", "emoji": "price ✅ 📦", "flags": [None, True, 1.25]},
+    {3: "três", 1: "um"},
+    {"big": 2 ** 70, "nested": {"é": ["ü", {"ключ": "значение"}]}},
+]
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_responses_match_flask_default_provider(app, payload, ensure_ascii):
+    orjson_provider = app_module.OrjsonProvider(app)
+    default_provider = DefaultJSONProvider(app)
+    orjson_provider.ensure_ascii = default_provider.ensure_ascii = ensure_ascii
+
+    with app.test_request_context():
+        assert orjson_provider.response(payload).get_data() == default_provider.response(payload).get_data()
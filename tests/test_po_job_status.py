@@ -0,0 +1,18 @@
+from app import set_po_job_state
+
+
+def test_status_returns_current_job_state(client, user):
+    set_po_job_state("job-1", user.id, "COMPARING")
+
+    response = client.get("/api/po-status/job-1")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert response.get_json() == {"job_id": "job-1", "state": "COMPARING"}
+
+
+def test_status_of_unknown_or_foreign_job_is_not_found(client, user):
+    set_po_job_state("job-2", user.id + 1, "SUCCESS", result={})
+
+    assert client.get("/api/po-status/job-2").status_code == 404
+    assert client.get("/api/po-status/missing").status_code == 404
@@ -0,0 +1,75 @@
+import io
+
+from conftest import make_workbook
+from models import PriceBook, PriceItem
+
+
+def upload(client, workbook, name="Header only"):
+    return client.post(
+        "/api/pricebooks",
+        data={"file": (workbook, "book.xlsx"), "pricebook_name": name},
+        content_type="multipart/form-data",
+    )
+
+
+def test_header_only_workbook_creates_empty_price_book(client):
+    workbook = make_workbook([["Item Number", "Description", "Notes", "List", "Net"]])
+
+    response = upload(client, workbook)
+
+    assert response.status_code == 200, response.get_json()
+    book = PriceBook.query.filter_by(name="Header only").one()
+    assert response.get_json()["price_book_id"] == book.id
+    assert PriceItem.query.filter_by(price_book_id=book.id).count() == 0
+
+
+def test_workbook_with_prices_loads_items(client):
+    workbook = make_workbook([
+        ["Item Number", "Description", "Notes", "List", "Net"],
+        ["ABC-1", "Widget", None, 10, 9.5],
+        ["ABC-2", "Gadget", None, 20, None],
+    ])
+
+    response = upload(client, workbook, name="Priced")
+
+    assert response.status_code == 200, response.get_json()
+    book = PriceBook.query.filter_by(name="Priced").one()
+    prices = {item.model_number: float(item.price) for item in PriceItem.query.filter_by(price_book_id=book.id)}
+    assert prices == {"ABC-1": 9.5, "ABC-2": 20.0}
+
+
+def test_failed_bulk_load_leaves_no_price_book_behind(client, monkeypatch):
+    import app as app_module
+    from app import db
+    from models import PriceItem as PriceItemModel
+
+    # The same bytes both times, so the second upload hits the content_sha256 check
+    workbook_bytes = make_workbook([
+        ["Item Number", "Description", "Notes", "List", "Net"],
+        ["ABC-1", None, None, None, 1],
+        ["ABC-2", None, None, None, 2],
+    ]).getvalue()
+
+    def failing_copy(price_data):
+        # Write part of the batch, then die the way a dropped connection mid-COPY would
+        db.session.execute(
+            PriceItemModel.__table__.insert(),
+            price_data[app_module.PRICE_ITEM_COPY_COLUMNS].head(1).to_dict("records")
+        )
+        raise RuntimeError("connection lost during COPY")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(app_module, "use_copy_for", lambda item_count: True)
+        patch.setattr(app_module, "copy_price_items", failing_copy)
+        response = upload(client, io.BytesIO(workbook_bytes), name="Big book")
+
+    assert response.status_code == 500
+    assert PriceBook.query.count() == 0
+    assert PriceItem.query.count() == 0
+
+    # Re-uploading the same file must load it, not return an empty book from the failed attempt
+    response = upload(client, io.BytesIO(workbook_bytes), name="Big book")
+
+    assert response.status_code == 200, response.get_json()
+    book = PriceBook.query.filter_by(name="Big book").one()
+    assert PriceItem.query.filter_by(price_book_id=book.id).count() == 2
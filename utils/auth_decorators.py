@@ -85,12 +85,15 @@ def organization_required(f: Callable) -> Callable:
                 return redirect(url_for('login'))
             
             if db_adapter.mode == DatabaseMode.SUPABASE:
-                # Get user's organization from Supabase
-                from repositories.user_repository import UserRepository
-                user_repo = UserRepository()
+                # Organization and role are mirrored into the token's app_metadata
+                # (see 010_user_app_metadata_claims.sql), so most requests skip the lookup.
+                # Tokens issued before the claims were set fall through to the users table.
+                claims = supabase_auth.get_app_claims(getattr(g, 'access_token', None)) or {}
+                user_data = claims if claims.get('organization_id') and claims.get('role') else None
                 
-                # Get user data from repository
-                user_data = user_repo.get_by_id(g.user.id)
+                if user_data is None:
+                    from repositories.user_repository import get_user_repository
+                    user_data = get_user_repository().get_by_id(g.user.id)
                 
                 if not user_data or not user_data.get('organization_id'):
                     logger.warning(f"User {g.user.id} has no organization")
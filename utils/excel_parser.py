@@ -2,24 +2,26 @@ import pandas as pd
 import logging
 import os
 
-def parse_excel_file(filepath):
+def parse_excel_file(excel_file):
     """
     Parses an Excel file to extract model numbers and prices using column positions
     
     Args:
-        filepath (str): Path to the Excel file
+        excel_file (str or file-like): Path to the Excel file, or a binary stream
+            such as an uploaded file's stream
     
     Returns:
-        dict: Dictionary mapping model numbers to price info with source column
+        pandas.DataFrame: One row per model number with model_number, price,
+            source_column and excel_row columns
     """
     try:
         # Log file info
-        logging.debug(f"Parsing Excel file: {filepath}")
-        logging.debug(f"File exists: {os.path.exists(filepath)}")
-        logging.debug(f"File size: {os.path.getsize(filepath)} bytes")
+        logging.debug(f"Parsing Excel file: {getattr(excel_file, 'name', excel_file)}")
+        if isinstance(excel_file, (str, os.PathLike)):
+            logging.debug(f"File size: {os.path.getsize(excel_file)} bytes")
         
         # Read the Excel file without headers to access by column position
-        df = pd.read_excel(filepath, header=None)
+        df = pd.read_excel(excel_file, header=None)
         
         # Log shape and first few rows
         logging.debug(f"Excel file shape: {df.shape}")
@@ -37,55 +39,46 @@ def parse_excel_file(filepath):
         
         # Extract model numbers and prices using column positions
         # Column A (index 0) = Item Number
-        # Column D (index 3) = Primary price location
-        # Column E (index 4) = Secondary price location
-        price_data = {}
+        # Column D (index 3) = Secondary price location
+        # Column E (index 4) = Primary price location
+        # Skip the header row (start from row 1); operate on whole columns at once
+        if df.shape[1] == 0:
+            return _empty_price_frame()
         
-        # Skip the header row (start from row 1)
-        for index, row in df.iterrows():
-            if index == 0:  # Skip header row
-                continue
-                
-            # Get item number from Column A (index 0)
-            if len(row) > 0:
-                model_number = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
-            else:
-                continue
-            
-            # Skip rows with empty model numbers
-            if not model_number or model_number == "nan":
-                continue
-            
-            # Look for price in Column E first (index 4) - NOW PRIMARY
-            price = None
-            price_column_header = None
-            
-            if len(row) > 4 and pd.notna(row.iloc[4]):
-                try:
-                    price = float(row.iloc[4])
-                    price_column_header = column_headers.get(4, "Column E")
-                except (ValueError, TypeError):
-                    pass
-            
-            # If no valid price in Column E, try Column D (index 3) as fallback
-            if price is None and len(row) > 3 and pd.notna(row.iloc[3]):
-                try:
-                    price = float(row.iloc[3])
-                    price_column_header = column_headers.get(3, "Column D")
-                except (ValueError, TypeError):
-                    pass
-            
-            # Store the price data with source column info and Excel row number
-            if price is not None and price_column_header is not None:
-                excel_row_number = index + 1  # Convert to 1-based row number (Excel style)
-                price_data[model_number] = {
-                    "price": f"{price:.2f}",
-                    "source_column": price_column_header,
-                    "excel_row": excel_row_number
-                }
-                logging.debug(f"Found item {model_number}: ${price:.2f} from '{price_column_header}' at Excel row {excel_row_number}")
-            else:
-                logging.warning(f"No valid price found for model {model_number} in columns D or E")
+        body = df.iloc[1:]
+        empty = pd.Series(index=body.index, dtype=float)
+        
+        # Get item number from Column A, skipping rows with empty model numbers
+        model_numbers = body[0].where(body[0].notna(), "").astype(str).str.strip()
+        has_model = (model_numbers != "") & (model_numbers != "nan")
+        
+        # Look for price in Column E first - NOW PRIMARY - then Column D as fallback
+        price_e = pd.to_numeric(body[4], errors='coerce') if df.shape[1] > 4 else empty
+        price_d = pd.to_numeric(body[3], errors='coerce') if df.shape[1] > 3 else empty
+        use_e = price_e.notna()
+        prices = price_e.where(use_e, price_d)
+        has_price = prices.notna()
+        
+        missing_price = has_model & ~has_price
+        if missing_price.any():
+            logging.warning(f"No valid price found in columns D or E for {int(missing_price.sum())} models")
+            logging.debug(f"Models without a valid price: {model_numbers[missing_price].tolist()}")
+        
+        # Store the price data with source column info and Excel row number
+        keep = has_model & has_price
+        price_data = pd.DataFrame({
+            "model_number": model_numbers[keep],
+            # Same rounding as the row-by-row parser's f"{price:.2f}" (numpy's round() differs at .xx5)
+            "price": prices[keep].map(lambda price: float(f"{price:.2f}")),
+            "source_column": use_e[keep].map({
+                True: column_headers.get(4, "Column E"),
+                False: column_headers.get(3, "Column D")
+            }),
+            "excel_row": body.index[keep.to_numpy()] + 1  # Convert to 1-based row number (Excel style)
+        })
+        
+        # A model listed more than once keeps its last row, as before
+        price_data = price_data.drop_duplicates(subset="model_number", keep="last").reset_index(drop=True)
         
         logging.debug(f"Successfully parsed {len(price_data)} items from Excel file")
         return price_data
@@ -93,3 +86,7 @@ def parse_excel_file(filepath):
     except Exception as e:
         logging.error(f"Error parsing Excel file: {str(e)}")
         raise
+
+def _empty_price_frame():
+    """Returns an empty price frame with the columns parse_excel_file produces"""
+    return pd.DataFrame(columns=["model_number", "price", "source_column", "excel_row"])
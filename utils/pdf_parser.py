@@ -3,12 +3,13 @@ import google.generativeai as genai
 import logging
 import base64
 
-def extract_data_from_pdf(pdf_path):
+def extract_data_from_pdf(pdf_file):
     """
     Extracts model numbers and prices from a PDF file using Google Gemini API
     
     Args:
-        pdf_path (str): Path to the PDF file
+        pdf_file (str or file-like): Path to the PDF file, or a binary stream
+            such as an uploaded file's stream
     
     Returns:
         list: List of dictionaries containing model and price
@@ -24,9 +25,12 @@ def extract_data_from_pdf(pdf_path):
         # Use Gemini 1.5 flash model - the currently available model
         model = genai.GenerativeModel('gemini-1.5-flash')
         
-        # Read the PDF file and encode it as base64
-        with open(pdf_path, 'rb') as f:
-            pdf_bytes = f.read()
+        # Read the PDF bytes and encode them as base64
+        if hasattr(pdf_file, 'read'):
+            pdf_bytes = pdf_file.read()
+        else:
+            with open(pdf_file, 'rb') as f:
+                pdf_bytes = f.read()
         
         pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
         
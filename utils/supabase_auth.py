@@ -133,6 +133,26 @@ class SupabaseAuth:
             print(f"Error getting user from token: {e}")
             return None
     
+    def get_app_claims(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """Read the server-set app_metadata claims from an access token locally
+        
+        Args:
+            access_token: JWT access token
+            
+        Returns:
+            app_metadata dict if the token verifies against SUPABASE_JWT_SECRET,
+            None if there is no secret or the token is invalid, expired or not HS256
+        """
+        if not self.jwt_secret or not access_token:
+            return None
+        
+        try:
+            claims = jwt.decode(access_token, self.jwt_secret,
+                                algorithms=['HS256'], audience='authenticated')
+        except jwt.InvalidTokenError:
+            return None
+        return claims.get('app_metadata') or {}
+    
     def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh access token using refresh token
         
@@ -4,13 +4,41 @@ Handles database connections, authentication, and storage operations
 """
 
 import os
+import functools
 from typing import Optional
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+except ImportError:
+    h2 = None
+
 # Load environment variables
 load_dotenv()
 
+# Connection pool per Supabase client; keep-alive expiry stays below the
+# idle timeout of Supabase's proxies so pooled sockets aren't reused after being closed
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+# The service-role client also runs long server-side RPCs (the data migration's
+# migrate_bundle and post_migration_finalize), so it keeps supabase-py's 120 s
+# PostgREST default rather than the request-path timeout
+ADMIN_HTTP_TIMEOUT = httpx.Timeout(float(os.environ.get("SUPABASE_ADMIN_TIMEOUT", "120")), connect=2.0)
+
+def _create_pooled_client(url: str, key: str, timeout: httpx.Timeout = HTTP_TIMEOUT) -> Client:
+    """
+    Create a Supabase client with its own pooled, keep-alive HTTP client
+    
+    supabase-py releases whose ClientOptions cannot take an httpx client keep
+    their built-in HTTP defaults
+    """
+    if 'httpx_client' not in getattr(ClientOptions, '__dataclass_fields__', {}):
+        return create_client(url, key)
+    http_client = httpx.Client(http2=h2 is not None, limits=HTTP_POOL_LIMITS, timeout=timeout)
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
+
 def get_supabase_client() -> Client:
     """
     Get Supabase client instance for user operations
@@ -22,12 +50,17 @@ def get_supabase_client() -> Client:
     if not url or not key:
         raise ValueError("Supabase credentials not found in environment variables")
     
-    return create_client(url, key)
+    return _create_pooled_client(url, key)
 
+@functools.lru_cache(maxsize=1)
 def get_supabase_admin_client() -> Client:
     """
     Get Supabase admin client with service role
     Used for administrative operations and bypassing RLS
+    
+    Cached so every caller shares one client and its keep-alive HTTP
+    connections. The anon client is not cached because it carries the
+    signed-in user's auth session.
     """
     url = os.environ.get("SUPABASE_URL")
     key = os.environ.get("SUPABASE_SERVICE_KEY")
@@ -35,7 +68,7 @@ def get_supabase_admin_client() -> Client:
     if not url or not key:
         raise ValueError("Supabase admin credentials not found in environment variables")
     
-    return create_client(url, key)
+    return _create_pooled_client(url, key, timeout=ADMIN_HTTP_TIMEOUT)
 
 def get_supabase_storage_client():
     """